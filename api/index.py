@@ -1,13 +1,42 @@
 from fastapi import FastAPI, HTTPException, UploadFile, File
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import ORJSONResponse
 import os
-import json
-from typing import Dict, Any, List
+import re
+import time
+import queue
+import asyncio
+import logging
+import logging.handlers
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import Optional
 import uuid
 from datetime import datetime, timezone
+from pydantic import BaseModel
+import orjson
 import structlog
 
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """Queue handler that drops records instead of blocking when the queue is full."""
+    
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            pass
+
+def _orjson_dumps(obj, default=None, **kwargs) -> str:
+    return orjson.dumps(obj, default=default).decode()
+
+# Request handlers only enqueue log records; a listener thread writes them out
+LOG_QUEUE_MAX_SIZE = 10_000
+log_queue = queue.Queue(maxsize=LOG_QUEUE_MAX_SIZE)
+log_listener = logging.handlers.QueueListener(log_queue, logging.StreamHandler())
+logging.basicConfig(level=logging.INFO, handlers=[DroppingQueueHandler(log_queue)])
+# Started at import so logs still flow when the serverless runtime skips lifespan events
+log_listener.start()
+
 # Configure structured logging for Vercel
 structlog.configure(
     processors=[
@@ -16,7 +45,7 @@ structlog.configure(
         structlog.stdlib.add_log_level,
         structlog.stdlib.PositionalArgumentsFormatter(),
         structlog.processors.TimeStamper(fmt="iso"),
-        structlog.dev.ConsoleRenderer()
+        structlog.processors.JSONRenderer(serializer=_orjson_dumps)
     ],
     context_class=dict,
     logger_factory=structlog.stdlib.LoggerFactory(),
@@ -26,13 +55,48 @@ structlog.configure(
 
 logger = structlog.get_logger()
 
+# Cached ISO-8601 UTC timestamp, refreshed by a background task every tick
+CLOCK_TICK_SECONDS = 0.1
+_now_iso = datetime.now(timezone.utc).isoformat()
+_now_refreshed_at = time.monotonic()
+
+def _refresh_now_iso():
+    global _now_iso, _now_refreshed_at
+    _now_iso = datetime.now(timezone.utc).isoformat()
+    _now_refreshed_at = time.monotonic()
+
+def utc_now_iso() -> str:
+    """Return the current UTC time as an ISO string, accurate to one clock tick."""
+    # Fall back to formatting inline if the refresher is not running
+    # (e.g. the serverless runtime skipped the lifespan events).
+    if time.monotonic() - _now_refreshed_at > CLOCK_TICK_SECONDS:
+        _refresh_now_iso()
+    return _now_iso
+
+async def _clock_loop():
+    while True:
+        _refresh_now_iso()
+        await asyncio.sleep(CLOCK_TICK_SECONDS)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start and stop the timestamp refresher; flush queued logs on shutdown."""
+    clock_task = asyncio.create_task(_clock_loop())
+    try:
+        yield
+    finally:
+        clock_task.cancel()
+        log_listener.stop()
+
 # Initialize FastAPI app
 app = FastAPI(
     title="LegalDocAI API",
     description="AI-powered legal document simplification platform",
     version="1.0.0",
     docs_url="/api/docs",
-    redoc_url="/api/redoc"
+    redoc_url="/api/redoc",
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan
 )
 
 # CORS middleware - configured for Vercel deployment
@@ -44,31 +108,137 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Maximum number of entries kept per in-memory store
+DEMO_STORE_MAX_ENTRIES = int(os.getenv("DEMO_STORE_MAX_ENTRIES", "1024"))
+
+class LRUStore(OrderedDict):
+    """Size-bounded dict that evicts the least recently used entry."""
+    
+    def __init__(self, maxsize: int = DEMO_STORE_MAX_ENTRIES):
+        super().__init__()
+        self.maxsize = maxsize
+    
+    def __getitem__(self, key):
+        value = super().__getitem__(key)
+        self.move_to_end(key)
+        return value
+    
+    def __setitem__(self, key, value):
+        super().__setitem__(key, value)
+        self.move_to_end(key)
+        if len(self) > self.maxsize:
+            self.popitem(last=False)
+
 # In-memory storage for demo (use a real database in production)
-demo_documents = {}
-demo_analyses = {}
+demo_documents = LRUStore()
+demo_analyses = LRUStore()
+
+# Mock Q&A responses optimized for Vercel
+MOCK_ANSWERS = {
+    "rent": "Based on the document analysis performed on Vercel, the rental terms are clearly defined with specific payment schedules.",
+    "deposit": "The security deposit information has been extracted and analyzed. All conditions for deposit return are outlined.",
+    "terms": "The key terms have been identified and simplified for your understanding using our AI analysis.",
+    "rights": "Your rights under this document have been analyzed and are clearly explained in plain language.",
+    "obligations": "Your obligations have been identified and summarized for easy understanding."
+}
+
+# Keyword priority follows the dict order above, not position in the question
+MOCK_ANSWER_ORDER = tuple(MOCK_ANSWERS)
+
+# Single compiled alternation, matched against the lowercased question
+MOCK_ANSWER_RE = re.compile("(" + "|".join(map(re.escape, MOCK_ANSWERS)) + ")")
+
+# Static response payloads, built once at import instead of per request
+ROOT_RESPONSE = {
+    "message": "Welcome to LegalDocAI API",
+    "version": "1.0.0",
+    "docs": "/api/docs",
+    "health": "/api/health",
+    "status": "running",
+    "environment": "production"
+}
+
+HEALTH_RESPONSE = {
+    "status": "healthy",
+    "environment": "vercel"
+}
+
+DEMO_USER_ID = "vercel-demo-user-id"
+DEMO_USER_EMAIL = "demo@legaldocai.com"
+DEMO_USER_NAME = "Vercel Demo User"
+
+DEMO_TOKEN_RESPONSE = {
+    "access_token": "vercel-demo-jwt-token-12345",
+    "token_type": "bearer",
+    "expires_in": 3600
+}
+
+DEMO_USER_PROFILE = {
+    "id": DEMO_USER_ID,
+    "email": DEMO_USER_EMAIL,
+    "full_name": DEMO_USER_NAME,
+    "is_active": True,
+    "created_at": "2024-01-01T00:00:00",
+    "platform": "vercel"
+}
+
+MOCK_ANALYSIS = {
+    "status": "completed",
+    "summary": "This is a comprehensive legal document analysis performed on Vercel serverless infrastructure. The document has been processed using AI-powered analysis to provide clear, accessible explanations.",
+    "simplified_explanation": "This document contains legal terms that have been simplified for better understanding. All key provisions have been analyzed and explained in plain language.",
+    "key_points": (
+        "Document processed successfully on Vercel",
+        "AI analysis completed with high confidence",
+        "All major clauses identified and explained",
+        "Risk assessment performed on key terms"
+    ),
+    "risk_assessment": {
+        "high_risk_items": ("Complex legal language requiring careful review",),
+        "medium_risk_items": ("Standard clauses with typical conditions",),
+        "protective_clauses": ("User rights and protections clearly outlined",)
+    },
+    "confidence_score": 0.88,
+    "processing_time_seconds": 1.2
+}
+
+DEFAULT_ANSWER = "Your question has been processed using our AI analysis system. Based on the document review, I can provide specific insights about the terms and conditions outlined in your document."
+
+# Upload validation
+ALLOWED_FILE_TYPES = frozenset({".pdf", ".docx", ".txt"})
+FILE_TYPE_ERROR = "File type not allowed. Supported types: .pdf, .docx, .txt"
+LEASE_RE = re.compile(r"lease", re.IGNORECASE)
+
+# Request bodies
+class AnalysisRequest(BaseModel):
+    analysis_type: str = "full_summary"
+    language: Optional[str] = "en"
+
+class QuestionRequest(BaseModel):
+    question: str = ""
+    language: Optional[str] = "en"
+
+class LoginRequest(BaseModel):
+    email: str = DEMO_USER_EMAIL
+    password: Optional[str] = None
+
+class RegisterRequest(BaseModel):
+    email: str = DEMO_USER_EMAIL
+    full_name: str = DEMO_USER_NAME
+    password: Optional[str] = None
 
 @app.get("/")
 @app.get("/api")
 async def root():
     """Root endpoint with API information."""
-    return {
-        "message": "Welcome to LegalDocAI API",
-        "version": "1.0.0",
-        "docs": "/api/docs",
-        "health": "/api/health",
-        "status": "running",
-        "environment": "production"
-    }
+    return ROOT_RESPONSE
 
 @app.get("/api/health")
 @app.get("/health")
 async def health_check():
     """Health check endpoint."""
     return {
-        "status": "healthy",
-        "environment": "vercel",
-        "timestamp": datetime.now(timezone.utc).isoformat()
+        **HEALTH_RESPONSE,
+        "timestamp": utc_now_iso()
     }
 
 @app.post("/api/v1/documents/upload")
@@ -76,29 +246,29 @@ async def upload_document(file: UploadFile = File(...)):
     """Document upload endpoint for Vercel deployment."""
     
     # Validate file type
-    allowed_types = [".pdf", ".docx", ".txt"]
-    file_extension = os.path.splitext(file.filename)[1].lower()
+    file_extension = os.path.splitext(file.filename)[1].casefold()
     
-    if file_extension not in allowed_types:
+    if file_extension not in ALLOWED_FILE_TYPES:
         raise HTTPException(
             status_code=400,
-            detail=f"File type not allowed. Supported types: {', '.join(allowed_types)}"
+            detail=FILE_TYPE_ERROR
         )
     
     # Create mock document
-    doc_id = str(uuid.uuid4())
+    doc_id = uuid.uuid4().hex
+    now_iso = utc_now_iso()
     document = {
         "id": doc_id,
         "filename": f"vercel_{file.filename}",
         "original_filename": file.filename,
         "file_size": file.size or 1024,
         "file_type": file_extension,
-        "document_type": "rental_agreement" if "lease" in file.filename.lower() else "general_legal",
+        "document_type": "rental_agreement" if LEASE_RE.search(file.filename) else "general_legal",
         "status": "completed",
         "page_count": 5,
         "word_count": 1200,
-        "created_at": datetime.now(timezone.utc).isoformat(),
-        "updated_at": datetime.now(timezone.utc).isoformat()
+        "created_at": now_iso,
+        "updated_at": now_iso
     }
     
     demo_documents[doc_id] = document
@@ -126,7 +296,7 @@ async def get_document(document_id: str):
     return demo_documents[document_id]
 
 @app.post("/api/v1/analysis/analyze/{document_id}")
-async def analyze_document(document_id: str, request: Dict[str, Any]):
+async def analyze_document(document_id: str, request: AnalysisRequest):
     """Document analysis endpoint."""
     
     if document_id not in demo_documents:
@@ -134,30 +304,16 @@ async def analyze_document(document_id: str, request: Dict[str, Any]):
     
     # Create mock analysis based on document type
     document = demo_documents[document_id]
-    analysis_id = str(uuid.uuid4())
+    analysis_id = uuid.uuid4().hex
+    now_iso = utc_now_iso()
     
     # Mock analysis results optimized for Vercel
     analysis_result = {
         "id": analysis_id,
-        "analysis_type": request.get("analysis_type", "full_summary"),
-        "status": "completed",
-        "summary": "This is a comprehensive legal document analysis performed on Vercel serverless infrastructure. The document has been processed using AI-powered analysis to provide clear, accessible explanations.",
-        "simplified_explanation": "This document contains legal terms that have been simplified for better understanding. All key provisions have been analyzed and explained in plain language.",
-        "key_points": [
-            "Document processed successfully on Vercel",
-            "AI analysis completed with high confidence",
-            "All major clauses identified and explained",
-            "Risk assessment performed on key terms"
-        ],
-        "risk_assessment": {
-            "high_risk_items": ["Complex legal language requiring careful review"],
-            "medium_risk_items": ["Standard clauses with typical conditions"],
-            "protective_clauses": ["User rights and protections clearly outlined"]
-        },
-        "confidence_score": 0.88,
-        "processing_time_seconds": 1.2,
-        "created_at": datetime.now(timezone.utc).isoformat(),
-        "completed_at": datetime.now(timezone.utc).isoformat()
+        "analysis_type": request.analysis_type,
+        **MOCK_ANALYSIS,
+        "created_at": now_iso,
+        "completed_at": now_iso
     }
     
     demo_analyses[analysis_id] = analysis_result
@@ -167,37 +323,26 @@ async def analyze_document(document_id: str, request: Dict[str, Any]):
     return analysis_result
 
 @app.post("/api/v1/analysis/question/{document_id}")
-async def ask_question(document_id: str, request: Dict[str, Any]):
+async def ask_question(document_id: str, request: QuestionRequest):
     """Q&A endpoint for document questions."""
     
     if document_id not in demo_documents:
         raise HTTPException(status_code=404, detail="Document not found")
     
-    question = request.get("question", "")
-    
-    # Mock Q&A responses optimized for Vercel
-    mock_answers = {
-        "rent": "Based on the document analysis performed on Vercel, the rental terms are clearly defined with specific payment schedules.",
-        "deposit": "The security deposit information has been extracted and analyzed. All conditions for deposit return are outlined.",
-        "terms": "The key terms have been identified and simplified for your understanding using our AI analysis.",
-        "rights": "Your rights under this document have been analyzed and are clearly explained in plain language.",
-        "obligations": "Your obligations have been identified and summarized for easy understanding."
-    }
+    question = request.question
     
     # Simple keyword matching for demo
-    answer = "Based on our Vercel-powered AI analysis, this document has been thoroughly reviewed. "
-    for keyword, response in mock_answers.items():
-        if keyword.lower() in question.lower():
-            answer = response
-            break
+    matches = MOCK_ANSWER_RE.findall(question.lower())
+    if matches:
+        answer = MOCK_ANSWERS[min(matches, key=MOCK_ANSWER_ORDER.index)]
     else:
-        answer = "Your question has been processed using our AI analysis system. Based on the document review, I can provide specific insights about the terms and conditions outlined in your document."
+        answer = DEFAULT_ANSWER
     
     response = {
         "question": question,
         "answer": answer,
         "confidence_score": 0.85,
-        "analysis_id": str(uuid.uuid4())
+        "analysis_id": uuid.uuid4().hex
     }
     
     logger.info("Question answered on Vercel", question=question[:50])
@@ -216,16 +361,14 @@ async def list_analyses():
 
 # Auth endpoints for demo
 @app.post("/api/v1/auth/login")
-async def demo_login(credentials: Dict[str, str]):
+async def demo_login(credentials: LoginRequest):
     """Demo login endpoint."""
     return {
-        "access_token": "vercel-demo-jwt-token-12345",
-        "token_type": "bearer",
-        "expires_in": 3600,
+        **DEMO_TOKEN_RESPONSE,
         "user": {
-            "id": "vercel-demo-user-id",
-            "email": credentials.get("email", "demo@legaldocai.com"),
-            "full_name": "Vercel Demo User",
+            "id": DEMO_USER_ID,
+            "email": credentials.email,
+            "full_name": DEMO_USER_NAME,
             "is_active": True,
             "documents_processed": len(demo_documents),
             "api_calls_count": len(demo_analyses)
@@ -233,28 +376,23 @@ async def demo_login(credentials: Dict[str, str]):
     }
 
 @app.post("/api/v1/auth/register")
-async def demo_register(user_data: Dict[str, str]):
+async def demo_register(user_data: RegisterRequest):
     """Demo registration endpoint."""
     return {
-        "id": "vercel-demo-user-id",
-        "email": user_data.get("email", "demo@legaldocai.com"),
-        "full_name": user_data.get("full_name", "Vercel Demo User"),
+        "id": DEMO_USER_ID,
+        "email": user_data.email,
+        "full_name": user_data.full_name,
         "is_active": True,
-        "created_at": datetime.now(timezone.utc).isoformat()
+        "created_at": utc_now_iso()
     }
 
 @app.get("/api/v1/users/me")
 async def get_current_user():
     """Demo user info endpoint."""
     return {
-        "id": "vercel-demo-user-id",
-        "email": "demo@legaldocai.com",
-        "full_name": "Vercel Demo User",
-        "is_active": True,
+        **DEMO_USER_PROFILE,
         "documents_processed": len(demo_documents),
-        "api_calls_count": len(demo_analyses),
-        "created_at": "2024-01-01T00:00:00",
-        "platform": "vercel"
+        "api_calls_count": len(demo_analyses)
     }
 
 # This is the handler function for Vercel
@@ -1,15 +1,24 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from typing import List, Optional
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
+from sqlalchemy import select, func, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import AsyncIterator, List, Optional
+from uuid import UUID
 from datetime import datetime, timezone
+from contextlib import asynccontextmanager
+import asyncio
+import time
 import structlog
 
-from app.core.database import get_db
+from app.core.database import AsyncSessionLocal, get_async_db
 from app.core.auth import get_current_user
+from app.core.config import settings
 from app.models.user import User
 from app.models.document import Document
 from app.models.analysis import Analysis
-from app.services.ai_analyzer import AIAnalyzer
+from app.services.ai_analyzer import AIAnalyzer, get_analyzer
+from app.services.document_authorizer import get_owned_document
 from app.schemas import (
     AnalysisRequest, AnalysisResponse, AnalysisList,
     QuestionRequest, QuestionResponse
@@ -18,20 +27,61 @@ from app.schemas import (
 logger = structlog.get_logger()
 router = APIRouter()
 
+# Admission control for calls into the AI backend
+analysis_semaphore = asyncio.Semaphore(settings.MAX_CONCURRENT_ANALYSES)
+analysis_waiters = 0
+
+class AnalysisReservation:
+    """A place in the AI backend queue, held from admission until a slot is acquired."""
+    
+    def __init__(self):
+        global analysis_waiters
+        analysis_waiters += 1
+        self._held = True
+    
+    def release(self):
+        """Give the place back; safe to call more than once."""
+        global analysis_waiters
+        if self._held:
+            self._held = False
+            analysis_waiters -= 1
+
+def ensure_analysis_capacity() -> AnalysisReservation:
+    """Reject the request up front if the AI backend queue is already full."""
+    # Check and reserve in one synchronous step, so concurrent requests
+    # cannot all pass the check before any of them is counted
+    if analysis_semaphore.locked() and analysis_waiters >= settings.MAX_QUEUED_ANALYSES:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Server busy, please retry shortly"
+        )
+    return AnalysisReservation()
+
+@asynccontextmanager
+async def analysis_slot(reservation: AnalysisReservation):
+    """Hold one of the MAX_CONCURRENT_ANALYSES slots for the duration of an AI call."""
+    try:
+        await analysis_semaphore.acquire()
+    finally:
+        reservation.release()
+    try:
+        yield
+    finally:
+        analysis_semaphore.release()
+
 @router.post("/analyze/{document_id}", response_model=AnalysisResponse)
 async def analyze_document(
-    document_id: str,
+    document_id: UUID,
     request: AnalysisRequest,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user),
+    analyzer: AIAnalyzer = Depends(get_analyzer)
 ):
     """Perform AI analysis on a document."""
     
-    # Verify document exists and belongs to user
-    document = db.query(Document).filter(
-        Document.id == document_id,
-        Document.user_id == current_user.id
-    ).first()
+    # Verify ownership and load the analysis columns in one query, before any
+    # Analysis is built, so a vanished document writes no row
+    document = await get_owned_document(db, document_id, current_user.id)
     
     if not document:
         raise HTTPException(
@@ -45,28 +95,27 @@ async def analyze_document(
             detail="Document processing not completed"
         )
     
+    # Build the analysis record in memory; it is written once with its results
+    analysis = Analysis(
+        user_id=current_user.id,
+        document_id=document_id,
+        analysis_type=request.analysis_type,
+        request_data=request.model_dump(mode="json"),
+        status="processing",
+        created_at=datetime.now(timezone.utc)
+    )
+    
+    reservation = ensure_analysis_capacity()
+    
     try:
-        # Create analysis record
-        analysis = Analysis(
-            user_id=current_user.id,
-            document_id=document_id,
-            analysis_type=request.analysis_type,
-            request_data=request.dict(),
-            status="processing"
-        )
-        
-        db.add(analysis)
-        db.commit()
-        db.refresh(analysis)
-        
         # Perform AI analysis
-        analyzer = AIAnalyzer()
-        result = await analyzer.analyze_document(
-            document=document,
-            analysis_type=request.analysis_type,
-            language=request.language or "en",
-            focus_areas=request.focus_areas
-        )
+        async with analysis_slot(reservation):
+            result = await analyzer.analyze_document(
+                document=document,
+                analysis_type=request.analysis_type,
+                language=request.language or "en",
+                focus_areas=request.focus_areas
+            )
         
         # Update analysis with results
         analysis.status = "completed"
@@ -81,22 +130,29 @@ async def analyze_document(
         analysis.confidence_score = result.get("confidence_score")
         analysis.completed_at = datetime.now(timezone.utc)
         
-        db.commit()
-        db.refresh(analysis)
+        # eager_defaults returns server-generated columns with the INSERT, and
+        # expire_on_commit=False keeps the loaded values, so no refresh is needed
+        db.add(analysis)
+        await db.commit()
         
         logger.info("Document analysis completed", 
                    analysis_id=analysis.id,
                    document_id=document_id,
                    analysis_type=request.analysis_type)
         
-        return AnalysisResponse.from_orm(analysis)
+        return AnalysisResponse.model_validate(analysis)
         
     except Exception as e:
-        logger.error("Document analysis failed", error=str(e))
-        if 'analysis' in locals():
-            analysis.status = "failed"
-            analysis.error_message = str(e)
-            db.commit()
+        # Analysis has no error column, so the reason is only kept in the log
+        logger.error("Document analysis failed",
+                    document_id=document_id,
+                    analysis_type=request.analysis_type,
+                    error=str(e))
+        reservation.release()
+        await db.rollback()
+        analysis.status = "failed"
+        db.add(analysis)
+        await db.commit()
         
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -105,18 +161,17 @@ async def analyze_document(
 
 @router.post("/question/{document_id}", response_model=QuestionResponse)
 async def ask_question(
-    document_id: str,
+    document_id: UUID,
     request: QuestionRequest,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user),
+    analyzer: AIAnalyzer = Depends(get_analyzer)
 ):
     """Ask a specific question about a document."""
     
-    # Verify document exists and belongs to user
-    document = db.query(Document).filter(
-        Document.id == document_id,
-        Document.user_id == current_user.id
-    ).first()
+    # Verify ownership and load the analysis columns in one query, before any
+    # Analysis is built, so a vanished document writes no row
+    document = await get_owned_document(db, document_id, current_user.id)
     
     if not document:
         raise HTTPException(
@@ -124,6 +179,8 @@ async def ask_question(
             detail="Document not found"
         )
     
+    reservation = ensure_analysis_capacity()
+    
     try:
         # Create Q&A analysis record
         analysis = Analysis(
@@ -135,16 +192,16 @@ async def ask_question(
         )
         
         db.add(analysis)
-        db.commit()
-        db.refresh(analysis)
+        await db.commit()
+        await db.refresh(analysis)
         
         # Get answer from AI
-        analyzer = AIAnalyzer()
-        result = await analyzer.answer_question(
-            document=document,
-            question=request.question,
-            language=request.language or "en"
-        )
+        async with analysis_slot(reservation):
+            result = await analyzer.answer_question(
+                document=document,
+                question=request.question,
+                language=request.language or "en"
+            )
         
         # Update analysis with answer
         analysis.status = "completed"
@@ -153,8 +210,8 @@ async def ask_question(
         analysis.processing_time_seconds = result.get("processing_time")
         analysis.completed_at = datetime.now(timezone.utc)
         
-        db.commit()
-        db.refresh(analysis)
+        await db.commit()
+        await db.refresh(analysis)
         
         logger.info("Question answered", 
                    analysis_id=analysis.id,
@@ -169,39 +226,141 @@ async def ask_question(
         
     except Exception as e:
         logger.error("Question answering failed", error=str(e))
+        reservation.release()
         if 'analysis' in locals():
             analysis.status = "failed"
-            db.commit()
+            await db.commit()
         
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Failed to answer question"
         )
 
+async def stream_and_record_answer(
+    analyzer: AIAnalyzer,
+    document: Document,
+    request: QuestionRequest,
+    analysis_id: UUID,
+    reservation: AnalysisReservation
+) -> AsyncIterator[str]:
+    """Relay answer chunks to the client, then store the full answer on the analysis."""
+    start_time = time.time()
+    chunks = []
+    values = {"status": "failed"}
+    try:
+        async with analysis_slot(reservation):
+            async for chunk in analyzer.stream_answer(
+                document=document,
+                question=request.question,
+                language=request.language or "en"
+            ):
+                chunks.append(chunk)
+                yield chunk
+        
+        answer = "".join(chunks)
+        values = {
+            "status": "completed",
+            "answer": answer,
+            "confidence_score": analyzer.calculate_confidence(answer),
+            "processing_time_seconds": time.time() - start_time,
+            "completed_at": datetime.now(timezone.utc)
+        }
+        logger.info("Question answered", analysis_id=analysis_id, document_id=document.id)
+    except Exception as e:
+        # Headers are already sent, so the client just sees the stream end
+        logger.error("Question answering failed", analysis_id=analysis_id, error=str(e))
+    finally:
+        # The request session may already be closed once streaming starts
+        async with AsyncSessionLocal() as db:
+            await db.execute(update(Analysis).where(Analysis.id == analysis_id).values(**values))
+            await db.commit()
+
+@router.post("/question/{document_id}/stream")
+async def ask_question_stream(
+    document_id: UUID,
+    request: QuestionRequest,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user),
+    analyzer: AIAnalyzer = Depends(get_analyzer)
+):
+    """Ask a question and stream the answer as plain text while it is generated."""
+    
+    # Verify ownership and load the analysis columns in one query, before any
+    # Analysis is built, so a vanished document writes no row
+    document = await get_owned_document(db, document_id, current_user.id)
+    
+    if not document:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Document not found"
+        )
+    
+    reservation = ensure_analysis_capacity()
+    
+    # Create Q&A analysis record; the stream fills in the answer when it finishes
+    analysis = Analysis(
+        user_id=current_user.id,
+        document_id=document_id,
+        analysis_type="qa",
+        question=request.question,
+        status="processing"
+    )
+    try:
+        db.add(analysis)
+        await db.commit()
+    except Exception:
+        reservation.release()
+        raise
+    
+    # The background release covers a client that disconnects before the
+    # stream starts, when the generator never runs
+    return StreamingResponse(
+        stream_and_record_answer(analyzer, document, request, analysis.id, reservation),
+        media_type="text/plain; charset=utf-8",
+        headers={"X-Analysis-Id": str(analysis.id)},
+        background=BackgroundTask(reservation.release)
+    )
+
 @router.get("/", response_model=AnalysisList)
 async def list_analyses(
-    document_id: Optional[str] = None,
+    document_id: Optional[UUID] = None,
     analysis_type: Optional[str] = None,
     skip: int = 0,
     limit: int = 100,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
 ):
     """List user's analyses."""
     
-    query = db.query(Analysis).filter(Analysis.user_id == current_user.id)
+    filters = [Analysis.user_id == current_user.id]
     
     if document_id:
-        query = query.filter(Analysis.document_id == document_id)
+        filters.append(Analysis.document_id == document_id)
     
     if analysis_type:
-        query = query.filter(Analysis.analysis_type == analysis_type)
+        filters.append(Analysis.analysis_type == analysis_type)
+    
+    # Fetch the page and the unpaginated total in one round-trip
+    result = await db.execute(
+        select(Analysis, func.count().over().label("total"))
+        .where(*filters)
+        .order_by(Analysis.created_at.desc())
+        .offset(skip)
+        .limit(limit)
+    )
+    rows = result.all()
+    analyses = [row.Analysis for row in rows]
     
-    total = query.count()
-    analyses = query.order_by(Analysis.created_at.desc()).offset(skip).limit(limit).all()
+    if rows:
+        total = rows[0].total
+    elif skip:
+        # Page is past the end, so the window carried no total
+        total = await db.scalar(select(func.count(Analysis.id)).where(*filters))
+    else:
+        total = 0
     
     return AnalysisList(
-        analyses=[AnalysisResponse.from_orm(analysis) for analysis in analyses],
+        analyses=[AnalysisResponse.model_validate(analysis) for analysis in analyses],
         total=total,
         skip=skip,
         limit=limit
@@ -209,16 +368,19 @@ async def list_analyses(
 
 @router.get("/{analysis_id}", response_model=AnalysisResponse)
 async def get_analysis(
-    analysis_id: str,
-    db: Session = Depends(get_db),
+    analysis_id: UUID,
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
 ):
     """Get a specific analysis."""
     
-    analysis = db.query(Analysis).filter(
-        Analysis.id == analysis_id,
-        Analysis.user_id == current_user.id
-    ).first()
+    result = await db.execute(
+        select(Analysis).where(
+            Analysis.id == analysis_id,
+            Analysis.user_id == current_user.id
+        )
+    )
+    analysis = result.scalar_one_or_none()
     
     if not analysis:
         raise HTTPException(
@@ -226,14 +388,14 @@ async def get_analysis(
             detail="Analysis not found"
         )
     
-    return AnalysisResponse.from_orm(analysis)
+    return AnalysisResponse.model_validate(analysis)
 
 @router.post("/{analysis_id}/feedback")
 async def submit_feedback(
-    analysis_id: str,
+    analysis_id: UUID,
     rating: int,
     feedback: Optional[str] = None,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
 ):
     """Submit feedback for an analysis."""
@@ -244,10 +406,13 @@ async def submit_feedback(
             detail="Rating must be between 1 and 5"
         )
     
-    analysis = db.query(Analysis).filter(
-        Analysis.id == analysis_id,
-        Analysis.user_id == current_user.id
-    ).first()
+    result = await db.execute(
+        select(Analysis).where(
+            Analysis.id == analysis_id,
+            Analysis.user_id == current_user.id
+        )
+    )
+    analysis = result.scalar_one_or_none()
     
     if not analysis:
         raise HTTPException(
@@ -258,7 +423,7 @@ async def submit_feedback(
     analysis.user_rating = rating
     analysis.user_feedback = feedback
     
-    db.commit()
+    await db.commit()
     
     logger.info("Analysis feedback submitted", 
                analysis_id=analysis_id,
@@ -1,10 +1,14 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import datetime, timedelta, timezone
+import asyncio
 import structlog
 
-from app.core.database import get_db
+from app.core.database import get_async_db
 from app.core.auth import create_access_token, get_password_hash, verify_password
 from app.models.user import User
 from app.schemas import UserCreate, UserResponse, LoginRequest, LoginResponse
@@ -17,39 +21,37 @@ security = HTTPBearer()
 @router.post("/register", response_model=UserResponse)
 async def register(
     user_data: UserCreate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Register a new user."""
     
-    # Check if user already exists
-    existing_user = db.query(User).filter(User.email == user_data.email).first()
-    if existing_user:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Email already registered"
-        )
-    
     try:
-        # Create new user
-        hashed_password = get_password_hash(user_data.password) if user_data.password else None
-        
-        user = User(
-            email=user_data.email,
-            full_name=user_data.full_name,
-            hashed_password=hashed_password,
-            firebase_uid=user_data.firebase_uid,
-            company=user_data.company,
-            role=user_data.role,
-            preferred_language=user_data.preferred_language or "en"
+        # Create new user (bcrypt is CPU-bound, keep it off the event loop)
+        hashed_password = (
+            await asyncio.to_thread(get_password_hash, user_data.password)
+            if user_data.password else None
         )
         
-        db.add(user)
-        db.commit()
-        db.refresh(user)
-        
-        logger.info("User registered successfully", user_id=user.id, email=user.email)
+        # Single INSERT; the unique email index rejects duplicates atomically
+        insert = postgresql_insert if db.bind.dialect.name == "postgresql" else sqlite_insert
+        stmt = (
+            insert(User)
+            .values(
+                email=user_data.email,
+                full_name=user_data.full_name,
+                hashed_password=hashed_password,
+                firebase_uid=user_data.firebase_uid,
+                company=user_data.company,
+                role=user_data.role,
+                preferred_language=user_data.preferred_language or "en"
+            )
+            .on_conflict_do_nothing(index_elements=[User.email])
+            .returning(User)
+        )
         
-        return UserResponse.from_orm(user)
+        result = await db.execute(stmt)
+        user = result.scalar_one_or_none()
+        await db.commit()
         
     except Exception as e:
         logger.error("User registration failed", error=str(e))
@@ -57,16 +59,27 @@ async def register(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Registration failed"
         )
+    
+    if user is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Email already registered"
+        )
+    
+    logger.info("User registered successfully", user_id=user.id, email=user.email)
+    
+    return UserResponse.from_orm(user)
 
 @router.post("/login", response_model=LoginResponse)
 async def login(
     login_data: LoginRequest,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Login user and return access token."""
     
     # Find user by email
-    user = db.query(User).filter(User.email == login_data.email).first()
+    result = await db.execute(select(User).where(User.email == login_data.email))
+    user = result.scalar_one_or_none()
     
     if not user:
         raise HTTPException(
@@ -81,7 +94,7 @@ async def login(
         pass
     elif user.hashed_password and login_data.password:
         # Verify password for email/password users
-        if not verify_password(login_data.password, user.hashed_password):
+        if not await asyncio.to_thread(verify_password, login_data.password, user.hashed_password):
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Invalid credentials"
@@ -100,12 +113,12 @@ async def login(
     
     # Update last login
     user.last_login = datetime.now(timezone.utc)
-    db.commit()
+    await db.commit()
     
     # Create access token
     access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
-        data={"sub": user.id}, expires_delta=access_token_expires
+        data={"sub": str(user.id)}, expires_delta=access_token_expires
     )
     
     logger.info("User logged in successfully", user_id=user.id, email=user.email)
@@ -120,7 +133,7 @@ async def login(
 @router.post("/firebase-auth", response_model=LoginResponse)
 async def firebase_auth(
     firebase_token: str,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Authenticate user with Firebase token."""
     
@@ -169,10 +182,11 @@ async def logout():
     return {"message": "Logged out successfully"}
 
 @router.post("/forgot-password")
-async def forgot_password(email: str, db: Session = Depends(get_db)):
+async def forgot_password(email: str, db: AsyncSession = Depends(get_async_db)):
     """Send password reset email."""
     
-    user = db.query(User).filter(User.email == email).first()
+    result = await db.execute(select(User).where(User.email == email))
+    user = result.scalar_one_or_none()
     
     if not user:
         # Don't reveal whether email exists or not
@@ -1,9 +1,11 @@
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, status, UploadFile, File
 from fastapi.responses import FileResponse
+from sqlalchemy import func
 from sqlalchemy.orm import Session
-from typing import List, Optional
+from typing import BinaryIO, List, Optional
+from uuid import UUID
 import os
-import aiofiles
+import asyncio
 import uuid
 from datetime import datetime, timedelta
 import structlog
@@ -12,45 +14,79 @@ from app.core.database import get_db
 from app.core.auth import get_current_user
 from app.models.user import User
 from app.models.document import Document
-from app.services.document_processor import DocumentProcessor
-from app.schemas import DocumentCreate, DocumentResponse, DocumentList
+from app.services.document_processor import DocumentProcessor, get_processor
+from app.schemas import (
+    DocumentCreate, DocumentResponse, DocumentList,
+    DocumentUploadError, DocumentBatchResponse
+)
 from app.core.config import settings
 
 logger = structlog.get_logger()
 router = APIRouter()
 
+FILE_TOO_LARGE_DETAIL = f"File too large. Maximum size: {settings.MAX_FILE_SIZE / 1024 / 1024}MB"
+ALLOWED_EXTENSIONS = frozenset(ext.lower() for ext in settings.ALLOWED_FILE_TYPES)
+FILE_TYPE_NOT_ALLOWED_DETAIL = f"File type not allowed. Supported types: {', '.join(settings.ALLOWED_FILE_TYPES)}"
+
+# Columns backing DocumentResponse, so list pages skip extracted_text
+DOCUMENT_RESPONSE_COLUMNS = tuple(getattr(Document, name) for name in DocumentResponse.model_fields)
+
+class FileTooLargeError(ValueError):
+    """Raised when an upload exceeds MAX_FILE_SIZE while being copied."""
+
+def save_upload(source: BinaryIO, file_path: str, max_size: int = settings.MAX_FILE_SIZE) -> int:
+    """Copy an upload to disk in fixed-size chunks and return the bytes written."""
+    bytes_written = 0
+    # Read into one reusable buffer instead of allocating bytes per chunk
+    buffer = memoryview(bytearray(settings.UPLOAD_CHUNK_SIZE))
+    with open(file_path, 'wb') as f:
+        while size := source.readinto(buffer):
+            bytes_written += size
+            # UploadFile.size can be missing, so enforce the limit on the bytes seen
+            if bytes_written > max_size:
+                raise FileTooLargeError(bytes_written)
+            f.write(buffer[:size])
+    return bytes_written
+
+def discard_upload(file_path: str):
+    """Remove a saved upload, ignoring files that were never written."""
+    try:
+        os.remove(file_path)
+    except FileNotFoundError:
+        pass
+
 @router.post("/upload", response_model=DocumentResponse)
 async def upload_document(
+    background_tasks: BackgroundTasks,
     file: UploadFile = File(...),
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_user),
+    processor: DocumentProcessor = Depends(get_processor)
 ):
     """Upload a legal document for analysis."""
     
     # Validate file type
-    if not file.filename.lower().endswith(tuple(settings.ALLOWED_FILE_TYPES)):
+    file_extension = os.path.splitext(file.filename)[1].lower()
+    if file_extension not in ALLOWED_EXTENSIONS:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"File type not allowed. Supported types: {', '.join(settings.ALLOWED_FILE_TYPES)}"
+            detail=FILE_TYPE_NOT_ALLOWED_DETAIL
         )
     
-    # Check file size
-    if file.size > settings.MAX_FILE_SIZE:
+    # Check file size (when the client declared one)
+    if file.size is not None and file.size > settings.MAX_FILE_SIZE:
         raise HTTPException(
             status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
-            detail=f"File too large. Maximum size: {settings.MAX_FILE_SIZE / 1024 / 1024}MB"
+            detail=FILE_TOO_LARGE_DETAIL
         )
     
     try:
         # Generate unique filename
-        file_extension = os.path.splitext(file.filename)[1]
-        unique_filename = f"{uuid.uuid4()}{file_extension}"
+        unique_filename = f"{uuid.uuid4().hex}{file_extension}"
         file_path = os.path.join(settings.UPLOAD_DIR, unique_filename)
         
-        # Save file
-        async with aiofiles.open(file_path, 'wb') as f:
-            content = await file.read()
-            await f.write(content)
+        # Save file with one thread hop for the whole copy instead of one per chunk
+        bytes_written = await asyncio.to_thread(save_upload, file.file, file_path)
         
         # Create document record
         document = Document(
@@ -58,19 +94,18 @@ async def upload_document(
             filename=unique_filename,
             original_filename=file.filename,
             file_path=file_path,
-            file_size=file.size,
-            file_type=file_extension.lower(),
+            file_size=bytes_written,
+            file_type=file_extension,
             mime_type=file.content_type,
             status="uploaded"
         )
         
         db.add(document)
-        db.commit()
-        db.refresh(document)
+        # The session is sync; keep its commit round-trips off the event loop
+        await asyncio.to_thread(db.commit)
         
-        # Start background processing
-        processor = DocumentProcessor()
-        await processor.process_document_async(document.id, db)
+        # Process after the response is sent
+        background_tasks.add_task(processor.process_document_async, document.id)
         
         logger.info("Document uploaded successfully", 
                    document_id=document.id, 
@@ -79,18 +114,102 @@ async def upload_document(
         
         return DocumentResponse.from_orm(document)
         
+    except FileTooLargeError:
+        await asyncio.to_thread(discard_upload, file_path)
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=FILE_TOO_LARGE_DETAIL
+        )
     except Exception as e:
         logger.error("Document upload failed", error=str(e))
         # Clean up file if it was created
-        if 'file_path' in locals() and os.path.exists(file_path):
-            os.remove(file_path)
+        if 'file_path' in locals():
+            await asyncio.to_thread(discard_upload, file_path)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Failed to upload document"
         )
 
+@router.post("/upload/batch", response_model=DocumentBatchResponse)
+async def upload_documents_batch(
+    background_tasks: BackgroundTasks,
+    files: List[UploadFile] = File(...),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+    processor: DocumentProcessor = Depends(get_processor)
+):
+    """Upload several documents and record them in a single transaction."""
+    
+    documents = []
+    errors = []
+    
+    for file in files:
+        # Validate each file; rejected files are reported instead of failing the batch
+        file_extension = os.path.splitext(file.filename)[1].lower()
+        if file_extension not in ALLOWED_EXTENSIONS:
+            errors.append(DocumentUploadError(filename=file.filename, detail=FILE_TYPE_NOT_ALLOWED_DETAIL))
+            continue
+        
+        if file.size is not None and file.size > settings.MAX_FILE_SIZE:
+            errors.append(DocumentUploadError(filename=file.filename, detail=FILE_TOO_LARGE_DETAIL))
+            continue
+        
+        unique_filename = f"{uuid.uuid4().hex}{file_extension}"
+        file_path = os.path.join(settings.UPLOAD_DIR, unique_filename)
+        
+        try:
+            bytes_written = await asyncio.to_thread(save_upload, file.file, file_path)
+        except FileTooLargeError:
+            await asyncio.to_thread(discard_upload, file_path)
+            errors.append(DocumentUploadError(filename=file.filename, detail=FILE_TOO_LARGE_DETAIL))
+            continue
+        except Exception as e:
+            logger.error("Document upload failed", filename=file.filename, error=str(e))
+            await asyncio.to_thread(discard_upload, file_path)
+            errors.append(DocumentUploadError(filename=file.filename, detail="Failed to upload document"))
+            continue
+        
+        documents.append(Document(
+            user_id=current_user.id,
+            filename=unique_filename,
+            original_filename=file.filename,
+            file_path=file_path,
+            file_size=bytes_written,
+            file_type=file_extension,
+            mime_type=file.content_type,
+            status="uploaded"
+        ))
+    
+    # One commit for every document row in the batch
+    try:
+        db.add_all(documents)
+        await asyncio.to_thread(db.commit)
+    except Exception as e:
+        logger.error("Document batch upload failed", error=str(e))
+        await asyncio.to_thread(db.rollback)
+        for document in documents:
+            await asyncio.to_thread(discard_upload, document.file_path)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to upload documents"
+        )
+    
+    # Process after the response is sent
+    for document in documents:
+        background_tasks.add_task(processor.process_document_async, document.id)
+    
+    logger.info("Document batch uploaded", 
+               uploaded=len(documents),
+               failed=len(errors),
+               user_id=current_user.id)
+    
+    return DocumentBatchResponse(
+        documents=[DocumentResponse.from_orm(document) for document in documents],
+        errors=errors
+    )
+
 @router.get("/", response_model=DocumentList)
-async def list_documents(
+def list_documents(
     skip: int = 0,
     limit: int = 100,
     status_filter: Optional[str] = None,
@@ -99,24 +218,44 @@ async def list_documents(
 ):
     """List user's documents."""
     
-    query = db.query(Document).filter(Document.user_id == current_user.id)
+    # Select plain rows rather than entities: no large TEXT columns are
+    # fetched and there are no relationships that could lazy-load per row.
+    # That holds for every page size; selectinload would only pay off (for
+    # large limits) once the response actually includes analyses.
+    query = db.query(*DOCUMENT_RESPONSE_COLUMNS).filter(
+        Document.user_id == current_user.id
+    )
     
     if status_filter:
         query = query.filter(Document.status == status_filter)
     
-    total = query.count()
-    documents = query.offset(skip).limit(limit).all()
+    # Fetch the page and the unpaginated total in one round-trip
+    documents = (
+        query.add_columns(func.count().over().label("total"))
+        .order_by(Document.created_at.desc())
+        .offset(skip)
+        .limit(limit)
+        .all()
+    )
+    
+    if documents:
+        total = documents[0].total
+    elif skip:
+        # Page is past the end, so the window carried no total
+        total = query.count()
+    else:
+        total = 0
     
     return DocumentList(
-        documents=[DocumentResponse.from_orm(doc) for doc in documents],
+        documents=list(map(DocumentResponse.model_validate, documents)),
         total=total,
         skip=skip,
         limit=limit
     )
 
 @router.get("/{document_id}", response_model=DocumentResponse)
-async def get_document(
-    document_id: str,
+def get_document(
+    document_id: UUID,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
@@ -136,8 +275,8 @@ async def get_document(
     return DocumentResponse.from_orm(document)
 
 @router.delete("/{document_id}")
-async def delete_document(
-    document_id: str,
+def delete_document(
+    document_id: UUID,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
@@ -156,8 +295,7 @@ async def delete_document(
     
     try:
         # Remove physical file
-        if os.path.exists(document.file_path):
-            os.remove(document.file_path)
+        discard_upload(document.file_path)
         
         # Delete from database (cascades to analyses)
         db.delete(document)
@@ -177,12 +315,14 @@ async def delete_document(
         )
 
 @router.get("/{document_id}/download")
-async def download_document(
-    document_id: str,
+def download_document(
+    document_id: UUID,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """Download the original document file."""
+    # Plain def: Starlette runs this in its threadpool, keeping the blocking
+    # query and filesystem check off the event loop
     
     document = db.query(Document).filter(
         Document.id == document_id,
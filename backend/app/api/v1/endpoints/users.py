@@ -1,9 +1,9 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
 import structlog
 
-from app.core.database import get_db
+from app.core.database import get_async_db
 from app.core.auth import get_current_user
 from app.models.user import User
 from app.schemas import UserResponse, UserUpdate
@@ -20,7 +20,7 @@ async def get_current_user_info(current_user: User = Depends(get_current_user)):
 async def update_current_user(
     user_data: UserUpdate,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Update current user's information."""
     
@@ -35,8 +35,8 @@ async def update_current_user(
         if user_data.preferred_language is not None:
             current_user.preferred_language = user_data.preferred_language
         
-        db.commit()
-        db.refresh(current_user)
+        await db.commit()
+        await db.refresh(current_user)
         
         logger.info("User updated successfully", user_id=current_user.id)
         
@@ -63,7 +63,7 @@ async def get_user_stats(current_user: User = Depends(get_current_user)):
 @router.delete("/me")
 async def delete_current_user(
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Delete current user account."""
     
@@ -74,8 +74,8 @@ async def delete_current_user(
         # 3. Send confirmation email
         # 4. Add grace period for account recovery
         
-        db.delete(current_user)
-        db.commit()
+        await db.delete(current_user)
+        await db.commit()
         
         logger.info("User account deleted", user_id=current_user.id)
         
@@ -1,21 +1,104 @@
-from sqlalchemy import create_engine, MetaData
+from sqlalchemy import create_engine, event, MetaData
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import QueuePool
 from app.core.config import settings
+import orjson
 import structlog
 
 logger = structlog.get_logger()
 
+def get_pool_options(database_url: str) -> dict:
+    """Connection pool sizing for the configured backend."""
+    if make_url(database_url).get_backend_name() == "sqlite":
+        # SQLite picks its own pool class; sizing options do not apply
+        return {}
+    return {
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_pre_ping": True,
+        "pool_recycle": settings.DB_POOL_RECYCLE_SECONDS,
+        "pool_timeout": settings.DB_POOL_TIMEOUT_SECONDS,
+    }
+
+def watch_pool_saturation(sync_engine, name: str):
+    """Warn when a checkout leaves the pool with no idle connections."""
+    pool = sync_engine.pool
+    if not isinstance(pool, QueuePool):
+        return
+
+    @event.listens_for(sync_engine, "checkout")
+    def on_checkout(dbapi_connection, connection_record, connection_proxy):
+        if pool.checkedout() >= pool.size():
+            logger.warning(
+                "Database pool saturated",
+                engine=name,
+                checked_out=pool.checkedout(),
+                pool_size=pool.size(),
+                overflow=pool.overflow()
+            )
+
+def orjson_serializer(value) -> str:
+    """JSON column serializer backed by orjson."""
+    return orjson.dumps(value).decode()
+
 # Create SQLAlchemy engine
 engine = create_engine(
     settings.DATABASE_URL,
-    pool_pre_ping=True,
-    pool_recycle=300,
-    echo=False  # Set to True for SQL debugging
+    echo=False,  # Set to True for SQL debugging
+    json_serializer=orjson_serializer,
+    json_deserializer=orjson.loads,
+    query_cache_size=settings.DB_QUERY_CACHE_SIZE,
+    **get_pool_options(settings.DATABASE_URL)
+)
+watch_pool_saturation(engine, "sync")
+
+# Create SessionLocal class; like the async sessions, committed objects stay
+# loaded so responses built after commit do not re-SELECT each row
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=engine)
+
+# Async drivers for the sync URLs accepted in DATABASE_URL
+ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+}
+
+def get_async_database_url(database_url: str) -> str:
+    """Rewrite a sync database URL to use the matching asyncio driver."""
+    url = make_url(database_url)
+    async_driver = ASYNC_DRIVERS.get(url.get_backend_name())
+    if async_driver is None or url.drivername == async_driver:
+        return database_url
+    return url.set(drivername=async_driver).render_as_string(hide_password=False)
+
+def get_async_connect_args(database_url: str) -> dict:
+    """Driver options for the async engine."""
+    if make_url(database_url).get_backend_name() == "postgresql":
+        # asyncpg prepares statements server-side and caches them per connection
+        return {"prepared_statement_cache_size": settings.DB_PREPARED_STATEMENT_CACHE_SIZE}
+    return {}
+
+# Create async SQLAlchemy engine
+async_engine = create_async_engine(
+    get_async_database_url(settings.DATABASE_URL),
+    echo=False,
+    json_serializer=orjson_serializer,
+    json_deserializer=orjson.loads,
+    query_cache_size=settings.DB_QUERY_CACHE_SIZE,
+    connect_args=get_async_connect_args(settings.DATABASE_URL),
+    **get_pool_options(settings.DATABASE_URL)
 )
+watch_pool_saturation(async_engine.sync_engine, "async")
 
-# Create SessionLocal class
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Create AsyncSessionLocal class
+AsyncSessionLocal = async_sessionmaker(
+    async_engine,
+    class_=AsyncSession,
+    autoflush=False,
+    expire_on_commit=False
+)
 
 # Create Base class for models
 Base = declarative_base()
@@ -33,4 +116,14 @@ def get_db():
         db.rollback()
         raise
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+async def get_async_db():
+    """Dependency to get an async database session."""
+    async with AsyncSessionLocal() as db:
+        try:
+            yield db
+        except Exception as e:
+            logger.error("Database session error", error=str(e))
+            await db.rollback()
+            raise
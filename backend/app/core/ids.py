@@ -0,0 +1,42 @@
+import os
+import threading
+import time
+import uuid
+
+# Random bytes are drawn from os.urandom in blocks rather than once per id
+RANDOM_BUFFER_SIZE = 4096
+
+_random_lock = threading.Lock()
+_random_buffer = b""
+_random_offset = 0
+
+def _random_bytes(count: int) -> bytes:
+    """Return count random bytes from the shared buffer, refilling it when empty."""
+    global _random_buffer, _random_offset
+    with _random_lock:
+        if _random_offset + count > len(_random_buffer):
+            _random_buffer = os.urandom(RANDOM_BUFFER_SIZE)
+            _random_offset = 0
+        chunk = _random_buffer[_random_offset:_random_offset + count]
+        _random_offset += count
+    return chunk
+
+def _reset_random_buffer():
+    """Forked workers must not hand out the parent's remaining random bytes."""
+    global _random_buffer, _random_offset
+    _random_buffer = b""
+    _random_offset = 0
+
+os.register_at_fork(after_in_child=_reset_random_buffer)
+
+def uuid7() -> uuid.UUID:
+    """Time-ordered UUID (RFC 9562 version 7) for primary keys.
+
+    The leading 48 bits are the Unix time in milliseconds, so new rows land at
+    the right-hand edge of the primary key index instead of at random pages.
+    """
+    timestamp_ms = time.time_ns() // 1_000_000
+    value = (timestamp_ms & 0xFFFFFFFFFFFF) << 80 | int.from_bytes(_random_bytes(10), "big")
+    value = (value & ~(0xF << 76)) | (0x7 << 76)  # version
+    value = (value & ~(0x3 << 62)) | (0x2 << 62)  # RFC 4122 variant
+    return uuid.UUID(int=value)
@@ -1,17 +1,37 @@
 from fastapi import FastAPI, HTTPException, Depends, UploadFile, File
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from sqlalchemy.orm import Session
+from sqlalchemy import text
 import os
+import asyncio
+import logging
 from typing import List, Optional
 from datetime import datetime, timezone
+import orjson
 import structlog
 
 from app.core.config import settings
-from app.core.database import engine, get_db
+from app.core.database import engine, async_engine
 from app.models import Base
 from app.api.v1.router import api_router
 from app.core.auth import verify_token
+from app.services.ai_analyzer import AIAnalyzer
+from app.services.document_processor import DocumentProcessor, shutdown_processing_executors
+from app.services.template_service import flush_template_usage, run_template_usage_flush_loop
+
+def _orjson_dumps(obj, default=None, **kwargs) -> str:
+    return orjson.dumps(obj, default=default).decode()
+
+# JSON lines for log aggregation in production, readable output everywhere else
+if settings.ENVIRONMENT == "production":
+    log_renderer = structlog.processors.JSONRenderer(serializer=_orjson_dumps)
+else:
+    log_renderer = structlog.dev.ConsoleRenderer()
+
+# Set the level once on the stdlib root logger; filter_by_level drops
+# disabled events before the remaining processors run
+logging.basicConfig(format="%(message)s", level=settings.LOG_LEVEL)
 
 # Configure structured logging
 structlog.configure(
@@ -21,7 +41,7 @@ structlog.configure(
         structlog.stdlib.add_log_level,
         structlog.stdlib.PositionalArgumentsFormatter(),
         structlog.processors.TimeStamper(fmt="iso"),
-        structlog.dev.ConsoleRenderer()
+        log_renderer
     ],
     context_class=dict,
     logger_factory=structlog.stdlib.LoggerFactory(),
@@ -31,6 +51,9 @@ structlog.configure(
 
 logger = structlog.get_logger()
 
+# Compiled once; the health check only needs a live connection, not a session
+HEALTH_CHECK_QUERY = text("SELECT 1")
+
 # Create database tables
 Base.metadata.create_all(bind=engine)
 
@@ -40,7 +63,8 @@ app = FastAPI(
     description="AI-powered legal document simplification platform",
     version="1.0.0",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    default_response_class=ORJSONResponse
 )
 
 # CORS middleware
@@ -69,11 +93,12 @@ async def root():
     }
 
 @app.get("/health")
-async def health_check(db: Session = Depends(get_db)):
+async def health_check():
     """Health check endpoint."""
     try:
         # Check database connection
-        db.execute("SELECT 1")
+        async with async_engine.connect() as connection:
+            await connection.execute(HEALTH_CHECK_QUERY)
         return {
             "status": "healthy",
             "database": "connected",
@@ -91,12 +116,34 @@ async def startup_event():
     # Ensure upload directory exists
     os.makedirs("uploads", exist_ok=True)
     
+    # Share one AI analyzer (and its model client) across requests
+    app.state.analyzer = AIAnalyzer()
+    app.state.processor = DocumentProcessor()
+    
+    # Template usage is counted in Redis and written to the database periodically
+    app.state.template_usage_task = asyncio.create_task(run_template_usage_flush_loop())
+    
     logger.info("LegalDocAI API started successfully")
 
 @app.on_event("shutdown")
 async def shutdown_event():
     """Application shutdown event."""
     logger.info("LegalDocAI API shutting down...")
+    
+    # Stop the periodic flush and write whatever usage is still buffered
+    app.state.template_usage_task.cancel()
+    try:
+        await asyncio.to_thread(flush_template_usage)
+    except Exception as e:
+        logger.error("Template usage flush failed", error=str(e))
+    
+    # Close the analyzer's cache connections and pooled database connections
+    await app.state.analyzer.close()
+    await async_engine.dispose()
+    engine.dispose()
+    
+    # Stop document extraction threads and PDF worker processes
+    shutdown_processing_executors()
 
 if __name__ == "__main__":
     import uvicorn
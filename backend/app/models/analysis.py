@@ -1,16 +1,22 @@
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, Text, ForeignKey, JSON, Float
+from sqlalchemy import Column, Uuid, Integer, String, DateTime, Boolean, Text, ForeignKey, JSON, Float, Index, func
 from sqlalchemy.orm import relationship
-from datetime import datetime, timezone
-import uuid
 
 from app.core.database import Base
+from app.core.ids import uuid7
 
 class Analysis(Base):
     __tablename__ = "analyses"
+    __table_args__ = (
+        # Match list_analyses: filter by user (optionally document/type), newest first
+        Index("idx_analyses_user_created", "user_id", "created_at"),
+        Index("idx_analyses_user_document_type_created", "user_id", "document_id", "analysis_type", "created_at"),
+    )
+    # Fetch server-generated timestamps in the INSERT/UPDATE itself (RETURNING)
+    __mapper_args__ = {"eager_defaults": True}
     
-    id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
-    user_id = Column(String, ForeignKey("users.id"), nullable=False)
-    document_id = Column(String, ForeignKey("documents.id"), nullable=False)
+    id = Column(Uuid, primary_key=True, default=uuid7)
+    user_id = Column(Uuid, ForeignKey("users.id"), nullable=False)
+    document_id = Column(Uuid, ForeignKey("documents.id"), nullable=False)
     
     # Analysis type and configuration
     analysis_type = Column(String, nullable=False)  # full_summary, risk_assessment, clause_explanation, qa
@@ -56,9 +62,9 @@ class Analysis(Base):
     user_feedback = Column(Text, nullable=True)
     
     # Timestamps
-    created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
-    updated_at = Column(DateTime, default=lambda: datetime.now(timezone.utc), onupdate=lambda: datetime.now(timezone.utc))
-    completed_at = Column(DateTime, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    completed_at = Column(DateTime(timezone=True), nullable=True)
     
     # Relationships
     user = relationship("User", back_populates="analyses")
@@ -1,15 +1,28 @@
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, Text, ForeignKey, Float
-from sqlalchemy.orm import relationship
-from datetime import datetime, timezone
-import uuid
+from sqlalchemy import Column, Uuid, Integer, String, DateTime, Boolean, Text, ForeignKey, Float, Index, text, func
+from sqlalchemy.orm import deferred, relationship
 
 from app.core.database import Base
+from app.core.ids import uuid7
 
 class Document(Base):
     __tablename__ = "documents"
+    __table_args__ = (
+        # Match list_documents: filter by user (optionally status), newest first
+        Index("idx_documents_user_status", "user_id", "status"),
+        Index("idx_documents_user_created", "user_id", "created_at"),
+        # Small partial index over documents still in flight
+        Index(
+            "idx_documents_user_active",
+            "user_id",
+            "status",
+            postgresql_where=text("status IN ('uploaded', 'processing')")
+        ),
+    )
+    # Fetch server-generated timestamps in the INSERT/UPDATE itself (RETURNING)
+    __mapper_args__ = {"eager_defaults": True}
     
-    id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
-    user_id = Column(String, ForeignKey("users.id"), nullable=False)
+    id = Column(Uuid, primary_key=True, default=uuid7)
+    user_id = Column(Uuid, ForeignKey("users.id"), nullable=False)
     
     # Document metadata
     filename = Column(String, nullable=False)
@@ -20,14 +33,18 @@ class Document(Base):
     mime_type = Column(String, nullable=False)
     
     # Document content
-    extracted_text = Column(Text, nullable=True)
+    # Full document text; only loaded when a query asks for it (load_only/undefer)
+    extracted_text = deferred(Column(Text, nullable=True), group="content")
     page_count = Column(Integer, nullable=True)
     word_count = Column(Integer, nullable=True)
+    # Computed once at ingestion so prompt consumers never rehash or recount the text
+    text_sha256 = Column(String(64), nullable=True)
+    token_count = Column(Integer, nullable=True)  # model tokens, when counting succeeded
     
     # Processing status
     status = Column(String, default="uploaded")  # uploaded, processing, completed, failed
-    processing_started_at = Column(DateTime, nullable=True)
-    processing_completed_at = Column(DateTime, nullable=True)
+    processing_started_at = Column(DateTime(timezone=True), nullable=True)
+    processing_completed_at = Column(DateTime(timezone=True), nullable=True)
     error_message = Column(Text, nullable=True)
     
     # Document classification
@@ -40,9 +57,9 @@ class Document(Base):
     retention_days = Column(Integer, default=30)
     
     # Timestamps
-    created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
-    updated_at = Column(DateTime, default=lambda: datetime.now(timezone.utc), onupdate=lambda: datetime.now(timezone.utc))
-    expires_at = Column(DateTime, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    expires_at = Column(DateTime(timezone=True), nullable=True)
     
     # Relationships
     user = relationship("User", back_populates="documents")
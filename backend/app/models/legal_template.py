@@ -1,13 +1,14 @@
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, Text, JSON, Float
-from datetime import datetime, timezone
-import uuid
+from sqlalchemy import Column, Uuid, Integer, String, DateTime, Boolean, Text, JSON, Float, func
 
 from app.core.database import Base
+from app.core.ids import uuid7
 
 class LegalTemplate(Base):
     __tablename__ = "legal_templates"
+    # Fetch server-generated timestamps in the INSERT/UPDATE itself (RETURNING)
+    __mapper_args__ = {"eager_defaults": True}
     
-    id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
+    id = Column(Uuid, primary_key=True, default=uuid7)
     
     # Template identification
     name = Column(String, nullable=False)
@@ -39,9 +40,9 @@ class LegalTemplate(Base):
     effectiveness_score = Column(Float, nullable=True)  # Based on user feedback
     
     # Timestamps
-    created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
-    updated_at = Column(DateTime, default=lambda: datetime.now(timezone.utc), onupdate=lambda: datetime.now(timezone.utc))
-    last_used = Column(DateTime, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    last_used = Column(DateTime(timezone=True), nullable=True)
     
     def __repr__(self):
         return f"<LegalTemplate(id={self.id}, name={self.name}, category={self.category})>"
\ No newline at end of file
@@ -1,14 +1,15 @@
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, Text
+from sqlalchemy import Column, Uuid, Integer, String, DateTime, Boolean, Text, func
 from sqlalchemy.orm import relationship
-from datetime import datetime, timezone
-import uuid
 
 from app.core.database import Base
+from app.core.ids import uuid7
 
 class User(Base):
     __tablename__ = "users"
+    # Fetch server-generated timestamps in the INSERT/UPDATE itself (RETURNING)
+    __mapper_args__ = {"eager_defaults": True}
     
-    id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
+    id = Column(Uuid, primary_key=True, default=uuid7)
     email = Column(String, unique=True, index=True, nullable=False)
     full_name = Column(String, nullable=False)
     hashed_password = Column(String, nullable=True)  # Nullable for OAuth users
@@ -17,9 +18,9 @@ class User(Base):
     firebase_uid = Column(String, unique=True, index=True, nullable=True)  # For Firebase Auth
     
     # Timestamps
-    created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
-    updated_at = Column(DateTime, default=lambda: datetime.now(timezone.utc), onupdate=lambda: datetime.now(timezone.utc))
-    last_login = Column(DateTime, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    last_login = Column(DateTime(timezone=True), nullable=True)
     
     # Profile information
     company = Column(String, nullable=True)
@@ -1,6 +1,7 @@
 from pydantic import BaseModel, Field
 from typing import List, Optional, Dict, Any
 from datetime import datetime
+from uuid import UUID
 
 # User schemas
 class UserCreate(BaseModel):
@@ -13,7 +14,7 @@ class UserCreate(BaseModel):
     preferred_language: Optional[str] = Field(default="en", description="Preferred language")
 
 class UserResponse(BaseModel):
-    id: str
+    id: UUID
     email: str
     full_name: str
     is_active: bool
@@ -52,7 +53,7 @@ class DocumentCreate(BaseModel):
     description: Optional[str] = None
 
 class DocumentResponse(BaseModel):
-    id: str
+    id: UUID
     filename: str
     original_filename: str
     file_size: int
@@ -73,6 +74,14 @@ class DocumentList(BaseModel):
     skip: int
     limit: int
 
+class DocumentUploadError(BaseModel):
+    filename: str
+    detail: str
+
+class DocumentBatchResponse(BaseModel):
+    documents: List[DocumentResponse]
+    errors: List[DocumentUploadError]
+
 # Analysis schemas
 class AnalysisRequest(BaseModel):
     analysis_type: str = Field(..., description="Type of analysis: full_summary, risk_assessment, clause_explanation")
@@ -80,7 +89,7 @@ class AnalysisRequest(BaseModel):
     focus_areas: Optional[List[str]] = Field(default=None, description="Specific areas to focus on")
 
 class AnalysisResponse(BaseModel):
-    id: str
+    id: UUID
     analysis_type: str
     status: str
     summary: Optional[str]
@@ -112,4 +121,4 @@ class QuestionResponse(BaseModel):
     question: str
     answer: str
     confidence_score: Optional[float]
-    analysis_id: str
\ No newline at end of file
+    analysis_id: UUID
\ No newline at end of file
@@ -1,15 +1,77 @@
 import time
-import json
-from typing import Dict, List, Optional, Any
+import asyncio
+from types import MappingProxyType
+from typing import AsyncIterator, Dict, List, Mapping, Optional, Any
+from collections import OrderedDict
+from fastapi import Request
 from google.cloud import aiplatform
 from vertexai.generative_models import GenerativeModel, Part
+import orjson
 import structlog
 
 from app.core.config import settings
 from app.models.document import Document
+from app.services.response_cache import ResponseCache
 
 logger = structlog.get_logger()
 
+# Character cut used when the model's token count is unavailable
+MAX_PROMPT_DOCUMENT_CHARS = 8000
+
+# Checklists for AI review by document type; shared and read-only
+LEGAL_TEMPLATES = MappingProxyType({
+    "rental_agreement": MappingProxyType({
+        "key_clauses": (
+            "rent_amount", "lease_term", "security_deposit", "maintenance_responsibilities",
+            "pet_policy", "subletting_rules", "termination_conditions"
+        ),
+        "red_flags": (
+            "excessive_fees", "unreasonable_restrictions", "unclear_termination",
+            "maintenance_burden_on_tenant", "automatic_renewal_clauses"
+        ),
+        "protective_elements": (
+            "reasonable_notice_periods", "deposit_return_procedures",
+            "habitability_guarantees", "privacy_protections"
+        )
+    }),
+    "loan_contract": MappingProxyType({
+        "key_clauses": (
+            "principal_amount", "interest_rate", "repayment_schedule", "default_conditions",
+            "collateral_requirements", "prepayment_penalties"
+        ),
+        "red_flags": (
+            "variable_interest_rates", "balloon_payments", "cross_default_clauses",
+            "excessive_fees", "personal_guarantees"
+        ),
+        "protective_elements": (
+            "fixed_interest_rates", "clear_payment_schedule", "grace_periods",
+            "reasonable_default_cure_periods"
+        )
+    })
+})
+
+class RequestRateLimiter:
+    """Token bucket that spaces requests to a per-minute quota."""
+    
+    def __init__(self, requests_per_minute: int):
+        self.capacity = requests_per_minute
+        self.rate = requests_per_minute / 60
+        self.tokens = float(requests_per_minute)
+        self.updated_at = time.monotonic()
+        self._lock = asyncio.Lock()
+    
+    async def acquire(self):
+        """Wait until a request may be sent."""
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+                self.updated_at = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
 class AIAnalyzer:
     """Service for AI-powered legal document analysis using Google Cloud Vertex AI."""
     
@@ -22,6 +84,71 @@ class AIAnalyzer:
         
         self.model = GenerativeModel(settings.VERTEX_AI_MODEL)
         self.timeout = settings.AI_TIMEOUT_SECONDS
+        self._semaphore = asyncio.Semaphore(settings.AI_MAX_CONCURRENCY)
+        self._rate_limiter = RequestRateLimiter(settings.AI_REQUESTS_PER_MINUTE)
+        self.cache = ResponseCache()
+        self.excerpt_tokens = settings.AI_PROMPT_DOCUMENT_TOKENS
+        self._excerpts = OrderedDict()  # text hash (or document_id) -> excerpt within the token budget
+    
+    async def _generate(self, prompt: str) -> str:
+        """Return the model's response text for a prompt without blocking the event loop."""
+        # Identical prompts (same document excerpt, type and options) reuse the answer
+        cached = await self.cache.get(settings.VERTEX_AI_MODEL, prompt)
+        if cached is not None:
+            return cached
+        
+        # Wait for quota before taking a slot, then cap in-flight requests
+        await self._rate_limiter.acquire()
+        async with self._semaphore:
+            response = await asyncio.wait_for(
+                self.model.generate_content_async(prompt),
+                timeout=self.timeout
+            )
+        
+        await self.cache.set(settings.VERTEX_AI_MODEL, prompt, response.text)
+        return response.text
+    
+    async def close(self):
+        """Release connections held by the analyzer."""
+        await self.cache.close()
+    
+    async def _get_document_excerpt(self, document: Document) -> str:
+        """Document text cut to AI_PROMPT_DOCUMENT_TOKENS of the model's tokens."""
+        text = document.extracted_text or ""
+        # Every token covers at least one character, so short texts always fit
+        if len(text) <= self.excerpt_tokens:
+            return text
+        # Counted at ingestion; documents within the budget need no further counting
+        if document.token_count is not None and document.token_count <= self.excerpt_tokens:
+            return text
+        
+        # Identical uploads share an excerpt; older rows without a hash fall back to the id
+        cache_key = document.text_sha256 or document.id
+        excerpt = self._excerpts.get(cache_key)
+        if excerpt is not None:
+            self._excerpts.move_to_end(cache_key)
+            return excerpt
+        
+        # Start from a generous character cut and shrink it by the measured overshoot
+        excerpt = text[:self.excerpt_tokens * 8]
+        try:
+            for _ in range(3):
+                token_count = (await self.model.count_tokens_async(excerpt)).total_tokens
+                if token_count <= self.excerpt_tokens:
+                    break
+                excerpt = excerpt[:int(len(excerpt) * self.excerpt_tokens / token_count * 0.95)]
+        except Exception as e:
+            logger.warning("Token count failed, truncating by characters",
+                          document_id=document.id,
+                          error=str(e))
+            return text[:MAX_PROMPT_DOCUMENT_CHARS]
+        
+        # Completed documents do not change, so the excerpt is reused across analyses
+        self._excerpts[cache_key] = excerpt
+        if len(self._excerpts) > settings.AI_EXCERPT_CACHE_MAX_ENTRIES:
+            self._excerpts.popitem(last=False)
+        
+        return excerpt
     
     async def analyze_document(
         self, 
@@ -37,7 +164,7 @@ class AIAnalyzer:
         try:
             # Get the appropriate prompt based on analysis type
             prompt = self._get_analysis_prompt(
-                document_text=document.extracted_text,
+                document_text=await self._get_document_excerpt(document),
                 document_type=document.document_type,
                 analysis_type=analysis_type,
                 language=language,
@@ -45,10 +172,10 @@ class AIAnalyzer:
             )
             
             # Generate response from AI
-            response = self.model.generate_content(prompt)
+            response_text = await self._generate(prompt)
             
             # Parse the AI response
-            result = self._parse_analysis_response(response.text, analysis_type)
+            result = self._parse_analysis_response(response_text, analysis_type)
             
             processing_time = time.time() - start_time
             result["processing_time"] = processing_time
@@ -79,17 +206,17 @@ class AIAnalyzer:
         
         try:
             prompt = self._get_qa_prompt(
-                document_text=document.extracted_text,
+                document_text=await self._get_document_excerpt(document),
                 document_type=document.document_type,
                 question=question,
                 language=language
             )
             
-            response = self.model.generate_content(prompt)
+            response_text = await self._generate(prompt)
             
             result = {
-                "answer": response.text.strip(),
-                "confidence_score": self._calculate_confidence(response.text),
+                "answer": response_text.strip(),
+                "confidence_score": self._calculate_confidence(response_text),
                 "processing_time": time.time() - start_time
             }
             
@@ -105,6 +232,59 @@ class AIAnalyzer:
                         error=str(e))
             raise
     
+    async def stream_answer(
+        self,
+        document: Document,
+        question: str,
+        language: str = "en"
+    ) -> AsyncIterator[str]:
+        """Yield the answer to a question as the model generates it."""
+        
+        prompt = self._get_qa_prompt(
+            document_text=await self._get_document_excerpt(document),
+            document_type=document.document_type,
+            question=question,
+            language=language
+        )
+        
+        cached = await self.cache.get(settings.VERTEX_AI_MODEL, prompt)
+        if cached is not None:
+            yield cached
+            return
+        
+        chunks = []
+        await self._rate_limiter.acquire()
+        async with self._semaphore:
+            async with asyncio.timeout(self.timeout):
+                responses = await self.model.generate_content_async(prompt, stream=True)
+                async for response in responses:
+                    chunks.append(response.text)
+                    yield response.text
+        
+        await self.cache.set(settings.VERTEX_AI_MODEL, prompt, "".join(chunks))
+    
+    def calculate_confidence(self, response_text: str) -> float:
+        """Confidence score for a complete response."""
+        return self._calculate_confidence(response_text)
+    
+    def _get_document_context(self, document_text: str, document_type: str) -> str:
+        """Shared prompt prefix for a document.
+        
+        The document body comes before anything request-specific, so every
+        analysis and question about the same document starts with an identical
+        prefix that Vertex AI can serve from its prompt cache.
+        """
+        
+        return f"""
+You are a legal expert AI assistant specialized in analyzing legal documents and explaining them in simple, accessible language. 
+The user has uploaded a {document_type} document and needs help understanding it.
+
+Document Type: {document_type}
+
+Document Content:
+{document_text}
+"""
+    
     def _get_analysis_prompt(
         self,
         document_text: str,
@@ -115,23 +295,21 @@ class AIAnalyzer:
     ) -> str:
         """Generate analysis prompt based on the analysis type."""
         
-        base_context = f"""
-You are a legal expert AI assistant specialized in analyzing legal documents and explaining them in simple, accessible language. 
-The user has uploaded a {document_type} document and needs help understanding it.
-
-Document Type: {document_type}
+        base_context = self._get_document_context(document_text, document_type) + f"""
 Analysis Type: {analysis_type}
 Language for Response: {language}
 Focus Areas: {', '.join(focus_areas) if focus_areas else 'General analysis'}
 
-Document Content:
-{document_text[:8000]}  # Limit text to prevent token overflow
-
 Please analyze this document and provide your response in JSON format with the following structure:
 """
         
+        return base_context + self._get_response_format(analysis_type)
+    
+    def _get_response_format(self, analysis_type: str) -> str:
+        """JSON structure the model should return for an analysis type."""
+        
         if analysis_type == "full_summary":
-            return base_context + """
+            return """
 {
     "summary": "A clear, concise summary of the document in plain language",
     "simplified_explanation": "Detailed explanation breaking down complex legal terms",
@@ -154,7 +332,7 @@ Please analyze this document and provide your response in JSON format with the f
 """
         
         elif analysis_type == "risk_assessment":
-            return base_context + """
+            return """
 {
     "risk_assessment": {
         "overall_risk_level": "low|medium|high",
@@ -179,7 +357,7 @@ Please analyze this document and provide your response in JSON format with the f
 """
         
         elif analysis_type == "clause_explanation":
-            return base_context + """
+            return """
 {
     "clauses_analyzed": [
         {
@@ -202,7 +380,7 @@ Please analyze this document and provide your response in JSON format with the f
 """
         
         else:  # general analysis
-            return base_context + """
+            return """
 {
     "summary": "Brief overview of the document",
     "key_takeaways": ["Most important things to know"],
@@ -220,12 +398,7 @@ Please analyze this document and provide your response in JSON format with the f
     ) -> str:
         """Generate Q&A prompt."""
         
-        return f"""
-You are a legal expert helping someone understand their {document_type}. 
-
-Document Content:
-{document_text[:8000]}
-
+        return self._get_document_context(document_text, document_type) + f"""
 User Question: {question}
 
 Please provide a clear, accurate answer in {language}. Be specific and refer to relevant parts of the document. 
@@ -240,10 +413,9 @@ If there are important caveats or recommendations, include them.
         
         try:
             # Try to extract JSON from the response
-            if "```json" in response_text:
-                json_start = response_text.find("```json") + 7
-                json_end = response_text.find("```", json_start)
-                json_text = response_text[json_start:json_end].strip()
+            _, fence, fenced_text = response_text.partition("```json")
+            if fence:
+                json_text = fenced_text.partition("```")[0].strip()
             elif "{" in response_text and "}" in response_text:
                 json_start = response_text.find("{")
                 json_end = response_text.rfind("}") + 1
@@ -255,7 +427,7 @@ If there are important caveats or recommendations, include them.
                     "confidence_score": 0.7
                 }
             
-            parsed_result = json.loads(json_text)
+            parsed_result = orjson.loads(json_text)
             
             # Ensure required fields exist
             if "confidence_score" not in parsed_result:
@@ -263,7 +435,7 @@ If there are important caveats or recommendations, include them.
             
             return parsed_result
             
-        except json.JSONDecodeError as e:
+        except orjson.JSONDecodeError as e:
             logger.warning("Failed to parse JSON response", error=str(e))
             # Return a basic structure
             return {
@@ -287,38 +459,13 @@ If there are important caveats or recommendations, include them.
         else:
             return 0.9  # Comprehensive response
     
-    def get_legal_templates(self, document_type: str) -> Dict[str, Any]:
+    def get_legal_templates(self, document_type: str) -> Mapping[str, Any]:
         """Get legal analysis templates for specific document types."""
-        
-        templates = {
-            "rental_agreement": {
-                "key_clauses": [
-                    "rent_amount", "lease_term", "security_deposit", "maintenance_responsibilities",
-                    "pet_policy", "subletting_rules", "termination_conditions"
-                ],
-                "red_flags": [
-                    "excessive_fees", "unreasonable_restrictions", "unclear_termination",
-                    "maintenance_burden_on_tenant", "automatic_renewal_clauses"
-                ],
-                "protective_elements": [
-                    "reasonable_notice_periods", "deposit_return_procedures",
-                    "habitability_guarantees", "privacy_protections"
-                ]
-            },
-            "loan_contract": {
-                "key_clauses": [
-                    "principal_amount", "interest_rate", "repayment_schedule", "default_conditions",
-                    "collateral_requirements", "prepayment_penalties"
-                ],
-                "red_flags": [
-                    "variable_interest_rates", "balloon_payments", "cross_default_clauses",
-                    "excessive_fees", "personal_guarantees"
-                ],
-                "protective_elements": [
-                    "fixed_interest_rates", "clear_payment_schedule", "grace_periods",
-                    "reasonable_default_cure_periods"
-                ]
-            }
-        }
-        
-        return templates.get(document_type, {})
\ No newline at end of file
+        return LEGAL_TEMPLATES.get(document_type, {})
+
+def get_analyzer(request: Request) -> AIAnalyzer:
+    """Dependency returning the application-wide AIAnalyzer."""
+    analyzer = getattr(request.app.state, "analyzer", None)
+    if analyzer is None:
+        analyzer = request.app.state.analyzer = AIAnalyzer()
+    return analyzer
\ No newline at end of file
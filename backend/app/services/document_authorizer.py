@@ -0,0 +1,33 @@
+from typing import Optional
+from uuid import UUID
+from sqlalchemy import select
+from sqlalchemy.orm import load_only
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.document import Document
+
+# Everything the AI endpoints read: status for the checks, the rest for the analyzer
+ANALYSIS_COLUMNS = (
+    Document.id,
+    Document.status,
+    Document.document_type,
+    Document.extracted_text,
+    Document.text_sha256,
+    Document.token_count
+)
+
+async def get_owned_document(
+    db: AsyncSession,
+    document_id: UUID,
+    user_id: UUID
+) -> Optional[Document]:
+    """Load the document's analysis columns if it belongs to the user, otherwise None.
+
+    Ownership and loading share one primary key query; the analyzer needs the
+    text anyway, so caching the ownership check would not save a round-trip.
+    """
+    query = select(Document).options(load_only(*ANALYSIS_COLUMNS)).where(
+        Document.id == document_id,
+        Document.user_id == user_id
+    )
+    return (await db.execute(query)).scalar_one_or_none()
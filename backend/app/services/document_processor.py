@@ -1,31 +1,196 @@
 import os
+import hashlib
 import asyncio
-from typing import Optional
+import threading
+import multiprocessing
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from itertools import repeat
+from types import MappingProxyType
+from typing import FrozenSet, List, Mapping, Optional
+from uuid import UUID
 from datetime import datetime, timezone
-import PyPDF2
-from docx import Document as DocxDocument
+import pypdfium2 as pdfium
+import ahocorasick
+from lxml import etree
+from vertexai.generative_models import GenerativeModel
 import structlog
+from fastapi import Request
 from sqlalchemy.orm import Session
 
+from app.core.database import SessionLocal
 from app.models.document import Document
 from app.core.config import settings
 
 logger = structlog.get_logger()
 
+# PDFium is not thread-safe, and extraction runs in the threadpool
+pdfium_lock = threading.Lock()
+
+# WordprocessingML elements that carry paragraph text
+DOCX_NAMESPACES = {
+    "w": "http://schemas.openxmlformats.org/wordprocessingml/2006/main",
+    "mc": "http://schemas.openxmlformats.org/markup-compatibility/2006",
+}
+WORD_NAMESPACE = "{%s}" % DOCX_NAMESPACES["w"]
+DOCX_TEXT = f"{WORD_NAMESPACE}t"
+DOCX_TEXT_BREAKS = {
+    f"{WORD_NAMESPACE}tab": "\t",
+    f"{WORD_NAMESPACE}br": "\n",
+    f"{WORD_NAMESPACE}cr": "\n",
+}
+
+# Text boxes are stored twice (mc:Choice and a VML mc:Fallback); keep one copy
+DOCX_PARAGRAPHS = etree.XPath("//w:p[not(ancestor::mc:Fallback)]", namespaces=DOCX_NAMESPACES)
+# Only run content belongs to a paragraph; this skips w:pPr tab stops and
+# the paragraphs of text boxes anchored inside its runs
+DOCX_RUN_CONTENT = etree.XPath(
+    "(w:r | w:hyperlink/w:r | w:ins/w:r | w:smartTag/w:r)"
+    "/*[self::w:t or self::w:tab or self::w:br or self::w:cr]",
+    namespaces=DOCX_NAMESPACES,
+)
+
+# Uploaded files are untrusted; never expand entities or fetch external resources
+docx_parser = etree.XMLParser(resolve_entities=False, no_network=True)
+
+# Keywords for different document types; immutable and built once at import
+CLASSIFICATION_RULES = MappingProxyType({
+    "rental_agreement": frozenset({
+        "lease", "rent", "tenant", "landlord", "premises", "monthly rent",
+        "security deposit", "rental agreement", "lease term"
+    }),
+    "loan_contract": frozenset({
+        "loan", "borrower", "lender", "principal", "interest rate", "repayment",
+        "default", "collateral", "loan agreement", "credit"
+    }),
+    "employment_contract": frozenset({
+        "employee", "employer", "salary", "employment", "job", "position",
+        "benefits", "termination", "employment agreement", "work"
+    }),
+    "terms_of_service": frozenset({
+        "terms of service", "terms and conditions", "user agreement",
+        "privacy policy", "acceptable use", "service", "platform"
+    }),
+    "purchase_agreement": frozenset({
+        "purchase", "buyer", "seller", "sale", "goods", "merchandise",
+        "purchase agreement", "delivery", "payment terms"
+    }),
+    "service_contract": frozenset({
+        "service", "contractor", "client", "services", "performance",
+        "service agreement", "deliverables", "scope of work"
+    }),
+})
+
+def build_keyword_automaton(rules: Mapping[str, FrozenSet[str]]) -> ahocorasick.Automaton:
+    """Aho-Corasick automaton matching every classification keyword."""
+    automaton = ahocorasick.Automaton()
+    for keyword in {keyword for keywords in rules.values() for keyword in keywords}:
+        automaton.add_word(keyword, keyword)
+    automaton.make_automaton()
+    return automaton
+
+CLASSIFICATION_AUTOMATON = build_keyword_automaton(CLASSIFICATION_RULES)
+
+# Extraction gets its own threads so long documents cannot starve the default
+# pool that request handlers use for short blocking calls
+processing_executor = ThreadPoolExecutor(
+    max_workers=settings.DOCUMENT_PROCESSING_WORKERS,
+    thread_name_prefix="document-processing"
+)
+
+pdf_executor: Optional[ProcessPoolExecutor] = None
+pdf_executor_lock = threading.Lock()
+
+def extract_pdf_page_range(file_path: str, start: int, stop: int) -> List[str]:
+    """Extract the text of pages [start, stop) from a PDF."""
+    pdf = pdfium.PdfDocument(file_path)
+    try:
+        text_content = []
+        for page_num in range(start, stop):
+            page = pdf[page_num]
+            textpage = page.get_textpage()
+            try:
+                text_content.append(textpage.get_text_range())
+            finally:
+                textpage.close()
+                page.close()
+        return text_content
+    finally:
+        pdf.close()
+
+def get_pdf_executor() -> ProcessPoolExecutor:
+    """Process pool for large PDFs, started on first use and reused afterwards."""
+    global pdf_executor
+    with pdf_executor_lock:
+        if pdf_executor is None:
+            # Spawn rather than fork: the server process has threads (and locks) running
+            pdf_executor = ProcessPoolExecutor(
+                max_workers=settings.PDF_EXTRACTION_WORKERS,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return pdf_executor
+
+def discard_pdf_executor(executor: ProcessPoolExecutor):
+    """Drop a broken process pool so the next large PDF starts a fresh one."""
+    global pdf_executor
+    with pdf_executor_lock:
+        # Another thread may already have replaced it
+        if pdf_executor is executor:
+            pdf_executor = None
+    executor.shutdown(wait=False, cancel_futures=True)
+
+def extract_pdf_pages_in_pool(file_path: str, page_count: int) -> List[str]:
+    """Extract the first page_count pages across the PDF worker processes."""
+    # One contiguous page range per worker, so each opens the PDF once
+    workers = min(settings.PDF_EXTRACTION_WORKERS, page_count)
+    bounds = [page_count * i // workers for i in range(workers + 1)]
+    for attempt in range(2):
+        executor = get_pdf_executor()
+        try:
+            text_content = []
+            for pages in executor.map(
+                extract_pdf_page_range, repeat(file_path), bounds[:-1], bounds[1:]
+            ):
+                text_content.extend(pages)
+            return text_content
+        except BrokenProcessPool:
+            # A worker died (crash or OOM); a broken pool fails every later call
+            discard_pdf_executor(executor)
+            if attempt:
+                raise
+            logger.warning("PDF worker pool broke, retrying on a new pool", file_path=file_path)
+
+def shutdown_processing_executors():
+    """Stop the processing threads and the PDF worker processes, if they were started."""
+    global pdf_executor
+    processing_executor.shutdown(wait=False, cancel_futures=True)
+    with pdf_executor_lock:
+        if pdf_executor is not None:
+            pdf_executor.shutdown(cancel_futures=True)
+            pdf_executor = None
+
 class DocumentProcessor:
     """Service for processing uploaded documents."""
     
     def __init__(self):
         self.max_pages = settings.MAX_DOCUMENT_PAGES
+        # Vertex AI is initialized by the analyzer, which is created first at startup
+        self.model = GenerativeModel(settings.VERTEX_AI_MODEL)
     
-    async def process_document_async(self, document_id: str, db: Session):
-        """Process document asynchronously."""
+    async def process_document_async(self, document_id: UUID):
+        """Process document asynchronously in its own database session."""
         # This would typically be run as a background task with Celery
-        # For now, we'll simulate async processing
-        await asyncio.sleep(0.1)  # Prevent blocking
-        return self.process_document(document_id, db)
+        # For now, run the blocking extraction and commits on the processing threads
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(processing_executor, self._process_document_in_session, document_id)
     
-    def process_document(self, document_id: str, db: Session) -> bool:
+    def _process_document_in_session(self, document_id: UUID) -> bool:
+        """Process a document outside any request; the request session is closed by then."""
+        with SessionLocal() as db:
+            return self.process_document(document_id, db)
+    
+    def process_document(self, document_id: UUID, db: Session) -> bool:
         """Process a document and extract text content."""
         try:
             document = db.query(Document).filter(Document.id == document_id).first()
@@ -63,6 +228,8 @@ class DocumentProcessor:
             document.extracted_text = extracted_text
             document.page_count = page_count
             document.word_count = word_count
+            document.text_sha256 = hashlib.sha256(extracted_text.encode()).hexdigest()
+            document.token_count = self._count_tokens(document_id, extracted_text)
             document.document_type = document_type
             document.confidence_score = confidence
             document.status = "completed"
@@ -83,7 +250,9 @@ class DocumentProcessor:
                         document_id=document_id, 
                         error=str(e))
             
-            # Update document with error status
+            # Update document with error status; a failed flush leaves the
+            # session unusable until it is rolled back
+            db.rollback()
             if 'document' in locals():
                 document.status = "failed"
                 document.error_message = str(e)
@@ -95,21 +264,25 @@ class DocumentProcessor:
     def _extract_from_pdf(self, file_path: str) -> tuple[str, int]:
         """Extract text from PDF file."""
         try:
-            with open(file_path, 'rb') as file:
-                pdf_reader = PyPDF2.PdfReader(file)
-                page_count = len(pdf_reader.pages)
-                
-                # Limit pages to prevent processing very large documents
-                pages_to_process = min(page_count, self.max_pages)
-                
-                text_content = []
-                for page_num in range(pages_to_process):
-                    page = pdf_reader.pages[page_num]
-                    text_content.append(page.extract_text())
-                
-                extracted_text = "\n".join(text_content)
-                return extracted_text, page_count
-                
+            with pdfium_lock:
+                pdf = pdfium.PdfDocument(file_path)
+                try:
+                    page_count = len(pdf)
+                finally:
+                    pdf.close()
+            
+            # Limit pages to prevent processing very large documents
+            pages_to_process = min(page_count, self.max_pages)
+            
+            if pages_to_process < settings.PDF_PARALLEL_MIN_PAGES:
+                with pdfium_lock:
+                    text_content = extract_pdf_page_range(file_path, 0, pages_to_process)
+            else:
+                text_content = extract_pdf_pages_in_pool(file_path, pages_to_process)
+            
+            extracted_text = "\n".join(text_content)
+            return extracted_text, page_count
+            
         except Exception as e:
             logger.error("PDF extraction failed", file_path=file_path, error=str(e))
             raise
@@ -117,8 +290,17 @@ class DocumentProcessor:
     def _extract_from_docx(self, file_path: str) -> tuple[str, int]:
         """Extract text from DOCX file."""
         try:
-            doc = DocxDocument(file_path)
-            paragraphs = [paragraph.text for paragraph in doc.paragraphs]
+            # Read the body XML directly instead of building python-docx objects;
+            # walking every <w:p> also picks up paragraphs inside tables
+            with zipfile.ZipFile(file_path) as docx:
+                root = etree.fromstring(docx.read("word/document.xml"), docx_parser)
+            
+            paragraphs = []
+            for paragraph in DOCX_PARAGRAPHS(root):
+                paragraphs.append("".join(
+                    (element.text or "") if element.tag == DOCX_TEXT else DOCX_TEXT_BREAKS[element.tag]
+                    for element in DOCX_RUN_CONTENT(paragraph)
+                ))
             extracted_text = "\n".join(paragraphs)
             
             # Estimate page count (rough approximation)
@@ -133,52 +315,40 @@ class DocumentProcessor:
     def _extract_from_txt(self, file_path: str) -> str:
         """Extract text from TXT file."""
         try:
-            with open(file_path, 'r', encoding='utf-8') as file:
-                return file.read()
+            # Read once; a failed UTF-8 decode falls back without re-reading the file
+            with open(file_path, 'rb') as file:
+                content = file.read()
+        except Exception as e:
+            logger.error("TXT extraction failed", file_path=file_path, error=str(e))
+            raise
+        
+        try:
+            return content.decode('utf-8')
         except UnicodeDecodeError:
             # Try with different encoding
-            try:
-                with open(file_path, 'r', encoding='latin-1') as file:
-                    return file.read()
-            except Exception as e:
-                logger.error("TXT extraction failed", file_path=file_path, error=str(e))
-                raise
+            return content.decode('latin-1')
+    
+    def _count_tokens(self, document_id: UUID, text: str) -> Optional[int]:
+        """Count the text's model tokens once, or None if counting fails."""
+        if not text:
+            return 0
+        try:
+            return self.model.count_tokens(text).total_tokens
+        except Exception as e:
+            # Analysis still works without it; the excerpt is then measured on demand
+            logger.warning("Token count failed", document_id=document_id, error=str(e))
+            return None
     
     def _classify_document(self, text: str) -> tuple[str, float]:
         """Classify document type based on content."""
         text_lower = text.lower()
         
-        # Define keywords for different document types
-        classification_rules = {
-            "rental_agreement": [
-                "lease", "rent", "tenant", "landlord", "premises", "monthly rent",
-                "security deposit", "rental agreement", "lease term"
-            ],
-            "loan_contract": [
-                "loan", "borrower", "lender", "principal", "interest rate", "repayment",
-                "default", "collateral", "loan agreement", "credit"
-            ],
-            "employment_contract": [
-                "employee", "employer", "salary", "employment", "job", "position",
-                "benefits", "termination", "employment agreement", "work"
-            ],
-            "terms_of_service": [
-                "terms of service", "terms and conditions", "user agreement",
-                "privacy policy", "acceptable use", "service", "platform"
-            ],
-            "purchase_agreement": [
-                "purchase", "buyer", "seller", "sale", "goods", "merchandise",
-                "purchase agreement", "delivery", "payment terms"
-            ],
-            "service_contract": [
-                "service", "contractor", "client", "services", "performance",
-                "service agreement", "deliverables", "scope of work"
-            ]
-        }
+        # One pass over the text finds every keyword, instead of one scan per keyword
+        found = {keyword for _, keyword in CLASSIFICATION_AUTOMATON.iter(text_lower)}
         
         scores = {}
-        for doc_type, keywords in classification_rules.items():
-            score = sum(1 for keyword in keywords if keyword in text_lower)
+        for doc_type, keywords in CLASSIFICATION_RULES.items():
+            score = len(found.intersection(keywords))
             scores[doc_type] = score / len(keywords)  # Normalize by keyword count
         
         # Find the type with highest score
@@ -190,4 +360,11 @@ class DocumentProcessor:
             if confidence > 0.2:  # At least 20% of keywords found
                 return best_type, confidence
         
-        return "general_legal", 0.0
\ No newline at end of file
+        return "general_legal", 0.0
+
+def get_processor(request: Request) -> DocumentProcessor:
+    """Dependency returning the application-wide DocumentProcessor."""
+    processor = getattr(request.app.state, "processor", None)
+    if processor is None:
+        processor = request.app.state.processor = DocumentProcessor()
+    return processor
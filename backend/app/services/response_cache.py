@@ -0,0 +1,46 @@
+import hashlib
+from typing import Optional
+import redis.asyncio as redis
+from redis.exceptions import RedisError
+import structlog
+
+from app.core.config import settings
+
+logger = structlog.get_logger()
+
+class ResponseCache:
+    """Redis cache of model responses keyed by the exact prompt sent."""
+
+    def __init__(self):
+        self.ttl = settings.AI_RESPONSE_CACHE_TTL_SECONDS
+        # from_url only builds the pool; connections are opened on first use
+        self._redis = redis.from_url(settings.REDIS_URL, decode_responses=True) if settings.REDIS_URL else None
+
+    def _get_key(self, model_name: str, prompt: str) -> str:
+        digest = hashlib.sha256(f"{model_name}\0{prompt}".encode()).hexdigest()
+        return f"ai:response:{digest}"
+
+    async def get(self, model_name: str, prompt: str) -> Optional[str]:
+        """Return the cached response text, or None on a miss or cache error."""
+        if self._redis is None:
+            return None
+        try:
+            return await self._redis.get(self._get_key(model_name, prompt))
+        except RedisError as e:
+            # The cache is an optimization; analysis continues without it
+            logger.warning("Response cache read failed", error=str(e))
+            return None
+
+    async def set(self, model_name: str, prompt: str, response_text: str):
+        """Store response text for a prompt, ignoring cache errors."""
+        if self._redis is None:
+            return
+        try:
+            await self._redis.setex(self._get_key(model_name, prompt), self.ttl, response_text)
+        except RedisError as e:
+            logger.warning("Response cache write failed", error=str(e))
+
+    async def close(self):
+        """Release pooled Redis connections."""
+        if self._redis is not None:
+            await self._redis.aclose()
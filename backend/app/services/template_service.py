@@ -1,33 +1,149 @@
+from sqlalchemy import bindparam, func
 from sqlalchemy.orm import Session
 from typing import List, Optional, Dict, Any
+from collections import OrderedDict
+import asyncio
+import threading
+import time
+from uuid import UUID
 from datetime import datetime, timezone
+import redis
+from redis.exceptions import RedisError
 import structlog
 from app.models.legal_template import LegalTemplate
-from app.core.database import get_db
+from app.core.config import settings
+from app.core.database import SessionLocal
 
 logger = structlog.get_logger()
 
+# Redis hashes of template id -> pending usage count / latest use time
+TEMPLATE_USAGE_KEY = "template:usage"
+TEMPLATE_LAST_USED_KEY = "template:last_used"
+
+legal_templates = LegalTemplate.__table__
+
+# Applies one template's buffered usage; executed once per template in a single batch
+apply_template_usage = (
+    legal_templates.update()
+    .where(legal_templates.c.id == bindparam("template_id"))
+    .values(
+        usage_count=legal_templates.c.usage_count + bindparam("delta"),
+        last_used=func.coalesce(bindparam("used_at"), legal_templates.c.last_used)
+    )
+)
+
 class TemplateService:
     """Service for managing legal document templates."""
     
     def __init__(self):
-        pass
+        # from_url only builds the pool; connections are opened on first use
+        self._redis = redis.Redis.from_url(settings.REDIS_URL, decode_responses=True) if settings.REDIS_URL else None
+        self.cache_ttl = settings.TEMPLATE_CACHE_TTL_SECONDS
+        self.cache_max_entries = settings.TEMPLATE_CACHE_MAX_ENTRIES
+        self._cache = OrderedDict()  # category -> (expires_at, template or None)
+        self._cache_lock = threading.Lock()  # sync callers may share the service across threads
     
     def get_template_by_category(self, db: Session, category: str) -> Optional[LegalTemplate]:
         """Get the most relevant template for a document category."""
+        template = self._get_cached_template(db, category)
+        
+        if template:
+            self._record_usage(db, template)
+            
+        return template
+    
+    def _get_cached_template(self, db: Session, category: str) -> Optional[LegalTemplate]:
+        """Look up the active template for a category, served from memory within the TTL."""
+        with self._cache_lock:
+            cached = self._cache.get(category)
+            if cached is not None:
+                expires_at, template = cached
+                if expires_at > time.monotonic():
+                    self._cache.move_to_end(category)
+                    return template
+                del self._cache[category]
+        
         template = db.query(LegalTemplate).filter(
             LegalTemplate.category == category,
             LegalTemplate.is_active == True
         ).first()
         
-        if template:
-            # Update usage count
-            template.usage_count += 1
-            template.last_used = datetime.now(timezone.utc)
-            db.commit()
-            
+        # Detach so the cached object outlives this session; categories
+        # without a template are cached too
+        if template is not None:
+            db.expunge(template)
+        with self._cache_lock:
+            self._cache[category] = (time.monotonic() + self.cache_ttl, template)
+            if len(self._cache) > self.cache_max_entries:
+                self._cache.popitem(last=False)
+        
         return template
     
+    def invalidate(self, category: Optional[str] = None):
+        """Drop cached templates for a category, or all of them."""
+        with self._cache_lock:
+            if category is None:
+                self._cache.clear()
+            else:
+                self._cache.pop(category, None)
+    
+    def _record_usage(self, db: Session, template: LegalTemplate):
+        """Count a template use in Redis; flush_usage writes the totals to the database."""
+        now = datetime.now(timezone.utc)
+        if self._redis is not None:
+            try:
+                pipeline = self._redis.pipeline()
+                pipeline.hincrby(TEMPLATE_USAGE_KEY, str(template.id), 1)
+                pipeline.hset(TEMPLATE_LAST_USED_KEY, str(template.id), now.isoformat())
+                pipeline.execute()
+                return
+            except RedisError as e:
+                logger.warning("Template usage buffering failed", error=str(e))
+        
+        # Without Redis, update the row directly (the cached object is detached)
+        db.execute(apply_template_usage, {"template_id": template.id, "delta": 1, "used_at": now})
+        db.commit()
+    
+    def flush_usage(self, db: Session) -> int:
+        """Write buffered template usage to the database and return the templates updated."""
+        if self._redis is None:
+            return 0
+        
+        # Read and clear both hashes atomically so no use is counted twice
+        pipeline = self._redis.pipeline(transaction=True)
+        pipeline.hgetall(TEMPLATE_USAGE_KEY)
+        pipeline.hgetall(TEMPLATE_LAST_USED_KEY)
+        pipeline.delete(TEMPLATE_USAGE_KEY, TEMPLATE_LAST_USED_KEY)
+        usage, last_used, _ = pipeline.execute()
+        
+        if not usage:
+            return 0
+        
+        try:
+            db.execute(apply_template_usage, [
+                {
+                    "template_id": UUID(template_id),
+                    "delta": int(delta),
+                    "used_at": datetime.fromisoformat(last_used[template_id]) if template_id in last_used else None
+                }
+                for template_id, delta in usage.items()
+            ])
+            db.commit()
+        except Exception:
+            db.rollback()
+            # Put the counts and timestamps back so the next flush retries them;
+            # a use recorded since the read keeps its newer timestamp
+            pipeline = self._redis.pipeline()
+            for template_id, delta in usage.items():
+                pipeline.hincrby(TEMPLATE_USAGE_KEY, template_id, int(delta))
+            for template_id, used_at in last_used.items():
+                pipeline.hsetnx(TEMPLATE_LAST_USED_KEY, template_id, used_at)
+            pipeline.execute()
+            raise
+        
+        logger.info("Template usage flushed", templates=len(usage))
+        return len(usage)
+    
     def get_analysis_guidelines(self, db: Session, document_type: str) -> Dict[str, Any]:
         """Get analysis guidelines for a specific document type."""
         template = self.get_template_by_category(db, document_type)
@@ -76,11 +192,12 @@ class TemplateService:
         db.add(template)
         db.commit()
         db.refresh(template)
+        self.invalidate(template.category)
         
         logger.info("Legal template created", template_id=template.id, category=template.category)
         return template
     
-    def update_template_effectiveness(self, db: Session, template_id: str, rating: float):
+    def update_template_effectiveness(self, db: Session, template_id: UUID, rating: float):
         """Update template effectiveness based on user feedback."""
         template = db.query(LegalTemplate).filter(LegalTemplate.id == template_id).first()
         if template:
@@ -91,6 +208,7 @@ class TemplateService:
                 template.effectiveness_score = rating
             
             db.commit()
+            self.invalidate(template.category)
             logger.info("Template effectiveness updated", 
                        template_id=template_id, 
                        new_score=template.effectiveness_score)
@@ -141,4 +259,20 @@ class TemplateService:
             "force_majeure": "Unforeseeable circumstances that prevent contract performance",
             "jurisdiction": "Which court system has authority over disputes",
             "severability": "If one part of contract is invalid, the rest remains valid"
-        }
\ No newline at end of file
+        }
+
+template_service = TemplateService()
+
+def flush_template_usage():
+    """Flush buffered template usage in a session of its own."""
+    with SessionLocal() as db:
+        template_service.flush_usage(db)
+
+async def run_template_usage_flush_loop():
+    """Persist buffered template usage every TEMPLATE_USAGE_FLUSH_SECONDS."""
+    while True:
+        await asyncio.sleep(settings.TEMPLATE_USAGE_FLUSH_SECONDS)
+        try:
+            await asyncio.to_thread(flush_template_usage)
+        except Exception as e:
+            logger.error("Template usage flush failed", error=str(e))
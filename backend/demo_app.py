@@ -1,13 +1,44 @@
-from fastapi import FastAPI, HTTPException, UploadFile, File
+from fastapi import FastAPI, HTTPException, Request, UploadFile, File
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import ORJSONResponse, Response
 import os
-import json
-from typing import Dict, Any, List
-import uuid
+import hashlib
+import time
+import queue
+import asyncio
+import logging
+import logging.handlers
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import Dict, Optional
 from datetime import datetime, timezone
+from pydantic import BaseModel
+import ahocorasick
+import orjson
 import structlog
 
+from app.core.ids import uuid7
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """Queue handler that drops records instead of blocking when the queue is full."""
+    
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            pass
+
+def _orjson_dumps(obj, default=None, **kwargs) -> str:
+    return orjson.dumps(obj, default=default).decode()
+
+# Request handlers only enqueue log records; a listener thread writes them out
+LOG_QUEUE_MAX_SIZE = 10_000
+log_queue = queue.Queue(maxsize=LOG_QUEUE_MAX_SIZE)
+log_listener = logging.handlers.QueueListener(log_queue, logging.StreamHandler())
+logging.basicConfig(level=logging.INFO, handlers=[DroppingQueueHandler(log_queue)])
+log_listener.start()
+
 # Configure structured logging
 structlog.configure(
     processors=[
@@ -16,7 +47,7 @@ structlog.configure(
         structlog.stdlib.add_log_level,
         structlog.stdlib.PositionalArgumentsFormatter(),
         structlog.processors.TimeStamper(fmt="iso"),
-        structlog.dev.ConsoleRenderer()
+        structlog.processors.JSONRenderer(serializer=_orjson_dumps)
     ],
     context_class=dict,
     logger_factory=structlog.stdlib.LoggerFactory(),
@@ -26,13 +57,51 @@ structlog.configure(
 
 logger = structlog.get_logger()
 
+# Cached ISO-8601 UTC timestamp, refreshed by a background task every tick
+CLOCK_TICK_SECONDS = 0.01
+_now_iso = datetime.now(timezone.utc).isoformat()
+_now_refreshed_at = time.monotonic()
+
+def _refresh_now_iso():
+    global _now_iso, _now_refreshed_at
+    _now_iso = datetime.now(timezone.utc).isoformat()
+    _now_refreshed_at = time.monotonic()
+
+def utc_now_iso() -> str:
+    """Return the current UTC time as an ISO string, accurate to one clock tick."""
+    # Fall back to formatting inline if the refresher is not running
+    if time.monotonic() - _now_refreshed_at > CLOCK_TICK_SECONDS:
+        _refresh_now_iso()
+    return _now_iso
+
+async def _clock_loop():
+    while True:
+        _refresh_now_iso()
+        await asyncio.sleep(CLOCK_TICK_SECONDS)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start and stop the timestamp refresher; flush queued logs on shutdown."""
+    clock_task = asyncio.create_task(_clock_loop())
+    try:
+        yield
+    finally:
+        clock_task.cancel()
+        log_listener.stop()
+
+# DEBUG=0 turns off the interactive docs and the OpenAPI schema they are built from
+API_DOCS_ENABLED = os.getenv("DEBUG", "1") != "0"
+
 # Initialize FastAPI app
 app = FastAPI(
     title="LegalDocAI API (Demo Mode)",
     description="AI-powered legal document simplification platform - Demo Version",
     version="1.0.0",
-    docs_url="/docs",
-    redoc_url="/redoc"
+    docs_url="/docs" if API_DOCS_ENABLED else None,
+    redoc_url="/redoc" if API_DOCS_ENABLED else None,
+    openapi_url="/openapi.json" if API_DOCS_ENABLED else None,
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan
 )
 
 # CORS middleware
@@ -44,86 +113,326 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# In-memory storage for demo
-demo_documents = {}
-demo_analyses = {}
+# Maximum number of entries kept per in-memory store
+DEMO_STORE_MAX_ENTRIES = int(os.getenv("DEMO_STORE_MAX_ENTRIES", "1024"))
+
+class LRUStore(dict):
+    """Size-bounded dict that evicts the least recently used entry.
+    
+    Iteration follows upload order; recency is tracked separately so reads
+    only affect which entry is evicted next. Entries are never modified after
+    they are stored, so each one is also kept JSON-encoded and listings are
+    assembled from those bytes.
+    """
+    
+    def __init__(self, maxsize: int = DEMO_STORE_MAX_ENTRIES):
+        super().__init__()
+        self.maxsize = maxsize
+        self.encoded = {}  # key -> orjson-encoded value
+        self._recency = OrderedDict()  # keys, least recently used first
+        # Bumped whenever contents change, so encoded listings can be reused
+        self.version = 0
+    
+    def __getitem__(self, key):
+        value = super().__getitem__(key)
+        self._recency.move_to_end(key)
+        return value
+    
+    def __setitem__(self, key, value):
+        super().__setitem__(key, value)
+        self._recency[key] = None
+        self._recency.move_to_end(key)
+        self.encoded[key] = orjson.dumps(value)
+        if len(self) > self.maxsize:
+            evicted, _ = self._recency.popitem(last=False)
+            super().__delitem__(evicted)
+            del self.encoded[evicted]
+        self.version += 1
+
+@dataclass(frozen=True, slots=True)
+class DemoDocument:
+    """Uploaded demo document; slotted, and encoded by orjson as a JSON object."""
+    id: str
+    filename: str
+    original_filename: str
+    file_size: int
+    file_type: str
+    document_type: str
+    status: str
+    page_count: int
+    word_count: int
+    created_at: str
+    updated_at: str
+
+# In-memory storage for demo. Every handler is async and runs on the event
+# loop thread, so the stores are never mutated concurrently and need no locks.
+demo_documents = LRUStore()
+demo_analyses = LRUStore()
+
+# HTTP caching: static payloads may be cached; everything else is revalidated
+STATIC_CACHE_CONTROL = "public, max-age=3600"
+REVALIDATE_CACHE_CONTROL = "no-cache"
+# Store versions restart with the process, so their ETags carry a per-process tag
+ETAG_PREFIX = uuid7().hex
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """True when the client's If-None-Match already names this ETag."""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is None:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return etag in (tag.strip().removeprefix("W/") for tag in if_none_match.split(","))
+
+def conditional_json(request: Request, etag: str, cache_control: str, render) -> Response:
+    """Answer 304 when the client's copy is current, otherwise the body from render()."""
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=render(), media_type="application/json", headers=headers)
+
+# Encoded list responses, keyed by listing name: (store version, JSON body)
+listing_cache = {}
+
+def encode_listing(name: str, store: LRUStore) -> bytes:
+    """Return a store's listing as JSON, encoding it again only after the store changes."""
+    cached = listing_cache.get(name)
+    if cached is None or cached[0] != store.version:
+        # Join the per-entry encodings in store order instead of re-encoding every entry
+        body = b"".join((
+            b'{"', name.encode(), b'":[',
+            b",".join(store.encoded[key] for key in store),
+            b'],"total":', str(len(store)).encode(),
+            b',"skip":0,"limit":100}'
+        ))
+        cached = listing_cache[name] = (store.version, body)
+    return cached[1]
+
+def render_listing(request: Request, name: str, store: LRUStore) -> Response:
+    """Listing response tagged with the store version it was built from."""
+    return conditional_json(
+        request,
+        f'"{ETAG_PREFIX}-{name}-{store.version}"',
+        REVALIDATE_CACHE_CONTROL,
+        lambda: encode_listing(name, store)
+    )
+
+# Static response payloads, built once at import instead of per request
+ROOT_RESPONSE = {
+    "message": "Welcome to LegalDocAI API - Demo Mode",
+    "version": "1.0.0",
+    "docs": "/docs" if API_DOCS_ENABLED else None,
+    "health": "/health",
+    "note": "This is running in demo mode without database"
+}
+
+ROOT_RESPONSE_BODY = orjson.dumps(ROOT_RESPONSE)
+ROOT_ETAG = f'"{hashlib.blake2b(ROOT_RESPONSE_BODY, digest_size=8).hexdigest()}"'
+
+# Never cached: every health check carries a fresh timestamp
+HEALTH_RESPONSE = {
+    "status": "healthy",
+    "mode": "demo"
+}
+
+# Upload validation
+ALLOWED_FILE_TYPES = frozenset({".pdf", ".docx", ".txt"})
+FILE_TYPE_ERROR = "File type not allowed. Supported types: .pdf, .docx, .txt"
+
+# Read size used when an upload's length has to be measured from its body
+UPLOAD_READ_CHUNK_SIZE = 1024 * 1024
+
+DEMO_USER_ID = "demo-user-id"
+DEMO_USER_EMAIL = "demo@example.com"
+DEMO_USER_NAME = "Demo User"
+
+DEMO_TOKEN_RESPONSE = {
+    "access_token": "demo-jwt-token-12345",
+    "token_type": "bearer",
+    "expires_in": 3600
+}
+
+DEMO_USER_PROFILE = {
+    "id": DEMO_USER_ID,
+    "email": DEMO_USER_EMAIL,
+    "full_name": DEMO_USER_NAME,
+    "is_active": True
+}
+
+RENTAL_ANALYSIS = {
+    "status": "completed",
+    "summary": "This is a standard residential lease agreement with monthly rent of $1,200. The lease term is 12 months starting January 1, 2024. Key provisions include a $1,800 security deposit, pet restrictions, and standard maintenance responsibilities.",
+    "simplified_explanation": "This rental agreement means you'll pay $1,200 every month for rent. You need to put down $1,800 as a security deposit (you'll get this back if you don't damage the place). The lease lasts for one year. You can't have pets without permission, and you're responsible for keeping the place clean while the landlord handles major repairs.",
+    "key_points": (
+        "Monthly rent: $1,200 due on the 1st of each month",
+        "Security deposit: $1,800 (refundable with conditions)",
+        "Lease term: 12 months",
+        "No pets allowed without written permission",
+        "Tenant responsible for utilities except water/sewer"
+    ),
+    "risk_assessment": {
+        "high_risk_items": ("No grace period for late rent payment",),
+        "medium_risk_items": ("Automatic lease renewal clause", "Tenant pays for minor repairs"),
+        "protective_clauses": ("30-day notice required for landlord entry", "Security deposit return procedure outlined")
+    },
+    "legal_implications": {
+        "rights": ("Right to quiet enjoyment", "Right to habitable premises", "Right to privacy"),
+        "obligations": ("Pay rent on time", "Maintain cleanliness", "Follow building rules"),
+        "consequences": ("Eviction for non-payment", "Loss of security deposit for damages", "Legal action for lease violations")
+    },
+    "confidence_score": 0.92,
+    "processing_time_seconds": 2.3
+}
+
+GENERAL_ANALYSIS = {
+    "status": "completed",
+    "summary": "This appears to be a general legal document with standard terms and conditions. The document contains typical legal language and clauses commonly found in agreements of this type.",
+    "simplified_explanation": "This is a legal agreement that sets out the rules and terms between the parties involved. It includes what each side needs to do and what happens if someone doesn't follow the rules.",
+    "key_points": (
+        "Document establishes legal relationship between parties",
+        "Contains standard terms and conditions",
+        "Includes dispute resolution procedures",
+        "Specifies obligations and rights of each party"
+    ),
+    "risk_assessment": {
+        "high_risk_items": ("Review needed for specific clause analysis",),
+        "medium_risk_items": ("Standard legal language requires careful reading",),
+        "protective_clauses": ("Dispute resolution clause present",)
+    },
+    "confidence_score": 0.75,
+    "processing_time_seconds": 1.8
+}
+
+MOCK_ANALYSES = {
+    "rental_agreement": RENTAL_ANALYSIS
+}
+
+# Request bodies
+class AnalysisRequest(BaseModel):
+    analysis_type: str = "full_summary"
+    language: Optional[str] = "en"
+
+class QuestionRequest(BaseModel):
+    question: str = ""
+    language: Optional[str] = "en"
+
+class LoginRequest(BaseModel):
+    email: str = DEMO_USER_EMAIL
+    password: Optional[str] = None
+
+class RegisterRequest(BaseModel):
+    email: str = DEMO_USER_EMAIL
+    full_name: str = DEMO_USER_NAME
+    password: Optional[str] = None
+
+# Mock Q&A responses, checked in this order when a question mentions several keywords
+MOCK_ANSWERS = {
+    "rent": "Based on the document, the monthly rent is $1,200 and is due on the 1st of each month. Late payments may incur additional fees.",
+    "deposit": "The security deposit is $1,800. This will be returned within 30 days after you move out, minus any deductions for damages beyond normal wear and tear.",
+    "pets": "Pets are not allowed without written permission from the landlord. If you want to have a pet, you'll need to ask for approval first.",
+    "maintenance": "You are responsible for basic maintenance and cleanliness. The landlord handles major repairs and structural issues.",
+    "termination": "The lease can be terminated with proper notice as specified in the agreement. Early termination may result in penalties."
+}
+
+DEFAULT_ANSWER = "Based on the document analysis, this appears to be a standard legal agreement. For specific details about your question, I recommend reviewing the relevant sections of the document or consulting with a legal professional."
+
+def build_answer_automaton(answers: Dict[str, str]) -> ahocorasick.Automaton:
+    """Aho-Corasick automaton mapping each keyword to (priority, answer)."""
+    automaton = ahocorasick.Automaton()
+    for priority, (keyword, answer) in enumerate(answers.items()):
+        automaton.add_word(keyword.lower(), (priority, answer))
+    automaton.make_automaton()
+    return automaton
+
+MOCK_ANSWER_AUTOMATON = build_answer_automaton(MOCK_ANSWERS)
+
+def find_mock_answer(question: str) -> Optional[str]:
+    """Answer for the highest-priority keyword in the question, found in one scan."""
+    best = min((match for _, match in MOCK_ANSWER_AUTOMATON.iter(question.lower())), default=None)
+    return best[1] if best is not None else None
 
 @app.get("/")
-async def root():
+async def root(request: Request):
     """Root endpoint with API information."""
-    return {
-        "message": "Welcome to LegalDocAI API - Demo Mode",
-        "version": "1.0.0",
-        "docs": "/docs",
-        "health": "/health",
-        "note": "This is running in demo mode without database"
-    }
+    return conditional_json(request, ROOT_ETAG, STATIC_CACHE_CONTROL, lambda: ROOT_RESPONSE_BODY)
 
 @app.get("/health")
 async def health_check():
     """Health check endpoint."""
     return {
-        "status": "healthy",
-        "mode": "demo",
-        "timestamp": datetime.now(timezone.utc).isoformat()
+        **HEALTH_RESPONSE,
+        "timestamp": utc_now_iso()
     }
 
 @app.post("/api/v1/documents/upload")
 async def upload_document(file: UploadFile = File(...)):
     """Demo document upload endpoint."""
     
-    # Validate file type
-    allowed_types = [".pdf", ".docx", ".txt"]
-    file_extension = os.path.splitext(file.filename)[1].lower()
+    # Validate file type; without a dot the whole (never allowed) name is compared
+    _, dot, extension = file.filename.rpartition(".")
+    file_extension = dot + extension.lower()
     
-    if file_extension not in allowed_types:
+    if file_extension not in ALLOWED_FILE_TYPES:
         raise HTTPException(
             status_code=400,
-            detail=f"File type not allowed. Supported types: {', '.join(allowed_types)}"
+            detail=FILE_TYPE_ERROR
         )
     
+    # The multipart parser normally records the size; otherwise count the body
+    # in large reads rather than reporting a placeholder
+    file_size = file.size
+    if file_size is None:
+        file_size = 0
+        while chunk := await file.read(UPLOAD_READ_CHUNK_SIZE):
+            file_size += len(chunk)
+    
     # Create mock document
-    doc_id = str(uuid.uuid4())
-    document = {
-        "id": doc_id,
-        "filename": f"demo_{file.filename}",
-        "original_filename": file.filename,
-        "file_size": file.size or 1024,
-        "file_type": file_extension,
-        "document_type": "rental_agreement" if "lease" in file.filename.lower() else "general_legal",
-        "status": "completed",
-        "page_count": 5,
-        "word_count": 1200,
-        "created_at": datetime.now(timezone.utc).isoformat(),
-        "updated_at": datetime.now(timezone.utc).isoformat()
-    }
+    doc_id = str(uuid7())
+    now_iso = utc_now_iso()
+    document = DemoDocument(
+        id=doc_id,
+        filename=f"demo_{file.filename}",
+        original_filename=file.filename,
+        file_size=file_size,
+        file_type=file_extension,
+        document_type="rental_agreement" if "lease" in file.filename.lower() else "general_legal",
+        status="completed",
+        page_count=5,
+        word_count=1200,
+        created_at=now_iso,
+        updated_at=now_iso
+    )
     
     demo_documents[doc_id] = document
     
     logger.info("Demo document uploaded", document_id=doc_id, filename=file.filename)
     
-    return document
+    # Storing the document already encoded it
+    return Response(content=demo_documents.encoded[doc_id], media_type="application/json")
 
 @app.get("/api/v1/documents/")
-async def list_documents():
+async def list_documents(request: Request):
     """List demo documents."""
-    return {
-        "documents": list(demo_documents.values()),
-        "total": len(demo_documents),
-        "skip": 0,
-        "limit": 100
-    }
+    return render_listing(request, "documents", demo_documents)
 
 @app.get("/api/v1/documents/{document_id}")
-async def get_document(document_id: str):
+async def get_document(document_id: str, request: Request):
     """Get demo document."""
     if document_id not in demo_documents:
         raise HTTPException(status_code=404, detail="Document not found")
     
-    return demo_documents[document_id]
+    # Documents never change after upload, so the unique id is a stable ETag
+    # and the bytes encoded at upload time are the response body
+    document = demo_documents[document_id]
+    return conditional_json(
+        request,
+        f'"{document.id}"',
+        REVALIDATE_CACHE_CONTROL,
+        lambda: demo_documents.encoded[document_id]
+    )
 
 @app.post("/api/v1/analysis/analyze/{document_id}")
-async def analyze_document(document_id: str, request: Dict[str, Any]):
+async def analyze_document(document_id: str, request: AnalysisRequest):
     """Demo document analysis endpoint."""
     
     if document_id not in demo_documents:
@@ -131,100 +440,42 @@ async def analyze_document(document_id: str, request: Dict[str, Any]):
     
     # Create mock analysis based on document type
     document = demo_documents[document_id]
-    analysis_id = str(uuid.uuid4())
+    analysis_id = str(uuid7())
     
-    # Mock analysis results
-    if document["document_type"] == "rental_agreement":
-        analysis_result = {
-            "id": analysis_id,
-            "analysis_type": request.get("analysis_type", "full_summary"),
-            "status": "completed",
-            "summary": "This is a standard residential lease agreement with monthly rent of $1,200. The lease term is 12 months starting January 1, 2024. Key provisions include a $1,800 security deposit, pet restrictions, and standard maintenance responsibilities.",
-            "simplified_explanation": "This rental agreement means you'll pay $1,200 every month for rent. You need to put down $1,800 as a security deposit (you'll get this back if you don't damage the place). The lease lasts for one year. You can't have pets without permission, and you're responsible for keeping the place clean while the landlord handles major repairs.",
-            "key_points": [
-                "Monthly rent: $1,200 due on the 1st of each month",
-                "Security deposit: $1,800 (refundable with conditions)",
-                "Lease term: 12 months",
-                "No pets allowed without written permission",
-                "Tenant responsible for utilities except water/sewer"
-            ],
-            "risk_assessment": {
-                "high_risk_items": ["No grace period for late rent payment"],
-                "medium_risk_items": ["Automatic lease renewal clause", "Tenant pays for minor repairs"],
-                "protective_clauses": ["30-day notice required for landlord entry", "Security deposit return procedure outlined"]
-            },
-            "legal_implications": {
-                "rights": ["Right to quiet enjoyment", "Right to habitable premises", "Right to privacy"],
-                "obligations": ["Pay rent on time", "Maintain cleanliness", "Follow building rules"],
-                "consequences": ["Eviction for non-payment", "Loss of security deposit for damages", "Legal action for lease violations"]
-            },
-            "confidence_score": 0.92,
-            "processing_time_seconds": 2.3,
-            "created_at": datetime.now(timezone.utc).isoformat(),
-            "completed_at": datetime.now(timezone.utc).isoformat()
-        }
-    else:
-        analysis_result = {
-            "id": analysis_id,
-            "analysis_type": request.get("analysis_type", "full_summary"),
-            "status": "completed",
-            "summary": "This appears to be a general legal document with standard terms and conditions. The document contains typical legal language and clauses commonly found in agreements of this type.",
-            "simplified_explanation": "This is a legal agreement that sets out the rules and terms between the parties involved. It includes what each side needs to do and what happens if someone doesn't follow the rules.",
-            "key_points": [
-                "Document establishes legal relationship between parties",
-                "Contains standard terms and conditions",
-                "Includes dispute resolution procedures",
-                "Specifies obligations and rights of each party"
-            ],
-            "risk_assessment": {
-                "high_risk_items": ["Review needed for specific clause analysis"],
-                "medium_risk_items": ["Standard legal language requires careful reading"],
-                "protective_clauses": ["Dispute resolution clause present"]
-            },
-            "confidence_score": 0.75,
-            "processing_time_seconds": 1.8,
-            "created_at": datetime.now(timezone.utc).isoformat(),
-            "completed_at": datetime.now(timezone.utc).isoformat()
-        }
+    # Stamp the per-request fields onto the static analysis for this document type
+    now_iso = utc_now_iso()
+    analysis_result = {
+        "id": analysis_id,
+        "analysis_type": request.analysis_type,
+        **MOCK_ANALYSES.get(document.document_type, GENERAL_ANALYSIS),
+        "created_at": now_iso,
+        "completed_at": now_iso
+    }
     
     demo_analyses[analysis_id] = analysis_result
     
     logger.info("Demo analysis completed", analysis_id=analysis_id, document_id=document_id)
     
-    return analysis_result
+    # The store has just encoded the analysis; send those bytes
+    return Response(content=demo_analyses.encoded[analysis_id], media_type="application/json")
 
 @app.post("/api/v1/analysis/question/{document_id}")
-async def ask_question(document_id: str, request: Dict[str, Any]):
+async def ask_question(document_id: str, request: QuestionRequest):
     """Demo Q&A endpoint."""
     
     if document_id not in demo_documents:
         raise HTTPException(status_code=404, detail="Document not found")
     
-    question = request.get("question", "")
-    
-    # Mock Q&A responses
-    mock_answers = {
-        "rent": "Based on the document, the monthly rent is $1,200 and is due on the 1st of each month. Late payments may incur additional fees.",
-        "deposit": "The security deposit is $1,800. This will be returned within 30 days after you move out, minus any deductions for damages beyond normal wear and tear.",
-        "pets": "Pets are not allowed without written permission from the landlord. If you want to have a pet, you'll need to ask for approval first.",
-        "maintenance": "You are responsible for basic maintenance and cleanliness. The landlord handles major repairs and structural issues.",
-        "termination": "The lease can be terminated with proper notice as specified in the agreement. Early termination may result in penalties."
-    }
+    question = request.question
     
     # Simple keyword matching for demo
-    answer = "I'd be happy to help answer your question about the document. "
-    for keyword, response in mock_answers.items():
-        if keyword.lower() in question.lower():
-            answer = response
-            break
-    else:
-        answer = "Based on the document analysis, this appears to be a standard legal agreement. For specific details about your question, I recommend reviewing the relevant sections of the document or consulting with a legal professional."
+    answer = find_mock_answer(question) or DEFAULT_ANSWER
     
     response = {
         "question": question,
         "answer": answer,
         "confidence_score": 0.85,
-        "analysis_id": str(uuid.uuid4())
+        "analysis_id": str(uuid7())
     }
     
     logger.info("Demo question answered", question=question[:50])
@@ -232,27 +483,20 @@ async def ask_question(document_id: str, request: Dict[str, Any]):
     return response
 
 @app.get("/api/v1/analysis/")
-async def list_analyses():
+async def list_analyses(request: Request):
     """List demo analyses."""
-    return {
-        "analyses": list(demo_analyses.values()),
-        "total": len(demo_analyses),
-        "skip": 0,
-        "limit": 100
-    }
+    return render_listing(request, "analyses", demo_analyses)
 
 # Demo auth endpoints
 @app.post("/api/v1/auth/login")
-async def demo_login(credentials: Dict[str, str]):
+async def demo_login(credentials: LoginRequest):
     """Demo login endpoint."""
     return {
-        "access_token": "demo-jwt-token-12345",
-        "token_type": "bearer",
-        "expires_in": 3600,
+        **DEMO_TOKEN_RESPONSE,
         "user": {
-            "id": "demo-user-id",
-            "email": credentials.get("email", "demo@example.com"),
-            "full_name": "Demo User",
+            "id": DEMO_USER_ID,
+            "email": credentials.email,
+            "full_name": DEMO_USER_NAME,
             "is_active": True,
             "documents_processed": len(demo_documents),
             "api_calls_count": len(demo_analyses)
@@ -260,30 +504,42 @@ async def demo_login(credentials: Dict[str, str]):
     }
 
 @app.post("/api/v1/auth/register")
-async def demo_register(user_data: Dict[str, str]):
+async def demo_register(user_data: RegisterRequest):
     """Demo registration endpoint."""
     return {
-        "id": "demo-user-id",
-        "email": user_data.get("email", "demo@example.com"),
-        "full_name": user_data.get("full_name", "Demo User"),
+        "id": DEMO_USER_ID,
+        "email": user_data.email,
+        "full_name": user_data.full_name,
         "is_active": True,
-        "created_at": datetime.now(timezone.utc).isoformat()
+        "created_at": utc_now_iso()
     }
 
 @app.get("/api/v1/users/me")
-async def get_current_user():
+async def get_current_user(request: Request):
     """Demo user info endpoint."""
-    return {
-        "id": "demo-user-id",
-        "email": "demo@example.com",
-        "full_name": "Demo User",
-        "is_active": True,
-        "documents_processed": len(demo_documents),
-        "api_calls_count": len(demo_analyses),
-        "created_at": "2024-01-01T00:00:00"
-    }
+    # Only the two counts vary, so they identify the representation
+    return conditional_json(
+        request,
+        f'"{ETAG_PREFIX}-me-{len(demo_documents)}-{len(demo_analyses)}"',
+        REVALIDATE_CACHE_CONTROL,
+        lambda: orjson.dumps({
+            **DEMO_USER_PROFILE,
+            "documents_processed": len(demo_documents),
+            "api_calls_count": len(demo_analyses),
+            "created_at": "2024-01-01T00:00:00"
+        })
+    )
 
 if __name__ == "__main__":
     import uvicorn
     logger.info("Starting LegalDocAI Demo Server...")
-    uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
+    # uvloop and httptools come with uvicorn[standard]. One worker only: the demo
+    # stores live in process memory, so extra workers would not share documents.
+    uvicorn.run(
+        app,
+        host="0.0.0.0",
+        port=8000,
+        loop="uvloop",
+        http="httptools",
+        access_log=False
+    )
\ No newline at end of file
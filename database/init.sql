@@ -13,9 +13,9 @@ CREATE TABLE IF NOT EXISTS users (
     is_active BOOLEAN DEFAULT TRUE,
     is_verified BOOLEAN DEFAULT FALSE,
     firebase_uid VARCHAR(255) UNIQUE,
-    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-    last_login TIMESTAMP,
+    created_at TIMESTAMPTZ DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMPTZ DEFAULT CURRENT_TIMESTAMP,
+    last_login TIMESTAMPTZ,
     company VARCHAR(255),
     role VARCHAR(255),
     preferred_language VARCHAR(10) DEFAULT 'en',
@@ -36,18 +36,20 @@ CREATE TABLE IF NOT EXISTS documents (
     extracted_text TEXT,
     page_count INTEGER,
     word_count INTEGER,
+    text_sha256 VARCHAR(64),
+    token_count INTEGER,
     status VARCHAR(50) DEFAULT 'uploaded',
-    processing_started_at TIMESTAMP,
-    processing_completed_at TIMESTAMP,
+    processing_started_at TIMESTAMPTZ,
+    processing_completed_at TIMESTAMPTZ,
     error_message TEXT,
     document_type VARCHAR(100),
     confidence_score DECIMAL(5,4),
     language VARCHAR(10) DEFAULT 'en',
     is_sensitive BOOLEAN DEFAULT TRUE,
     retention_days INTEGER DEFAULT 30,
-    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-    expires_at TIMESTAMP
+    created_at TIMESTAMPTZ DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMPTZ DEFAULT CURRENT_TIMESTAMP,
+    expires_at TIMESTAMPTZ
 );
 
 -- Analyses table
@@ -80,9 +82,9 @@ CREATE TABLE IF NOT EXISTS analyses (
     human_reviewed BOOLEAN DEFAULT FALSE,
     user_rating INTEGER CHECK (user_rating >= 1 AND user_rating <= 5),
     user_feedback TEXT,
-    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-    completed_at TIMESTAMP
+    created_at TIMESTAMPTZ DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMPTZ DEFAULT CURRENT_TIMESTAMP,
+    completed_at TIMESTAMPTZ
 );
 
 -- Legal Templates table
@@ -105,9 +107,9 @@ CREATE TABLE IF NOT EXISTS legal_templates (
     is_active BOOLEAN DEFAULT TRUE,
     usage_count INTEGER DEFAULT 0,
     effectiveness_score DECIMAL(5,4),
-    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-    last_used TIMESTAMP
+    created_at TIMESTAMPTZ DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMPTZ DEFAULT CURRENT_TIMESTAMP,
+    last_used TIMESTAMPTZ
 );
 
 -- Create indexes for better performance
@@ -116,9 +118,14 @@ CREATE INDEX IF NOT EXISTS idx_users_firebase_uid ON users(firebase_uid);
 CREATE INDEX IF NOT EXISTS idx_documents_user_id ON documents(user_id);
 CREATE INDEX IF NOT EXISTS idx_documents_status ON documents(status);
 CREATE INDEX IF NOT EXISTS idx_documents_document_type ON documents(document_type);
+CREATE INDEX IF NOT EXISTS idx_documents_user_status ON documents(user_id, status);
+CREATE INDEX IF NOT EXISTS idx_documents_user_created ON documents(user_id, created_at);
+CREATE INDEX IF NOT EXISTS idx_documents_user_active ON documents(user_id, status) WHERE status IN ('uploaded', 'processing');
 CREATE INDEX IF NOT EXISTS idx_analyses_user_id ON analyses(user_id);
 CREATE INDEX IF NOT EXISTS idx_analyses_document_id ON analyses(document_id);
 CREATE INDEX IF NOT EXISTS idx_analyses_analysis_type ON analyses(analysis_type);
+CREATE INDEX IF NOT EXISTS idx_analyses_user_created ON analyses(user_id, created_at);
+CREATE INDEX IF NOT EXISTS idx_analyses_user_document_type_created ON analyses(user_id, document_id, analysis_type, created_at);
 CREATE INDEX IF NOT EXISTS idx_legal_templates_category ON legal_templates(category);
 CREATE INDEX IF NOT EXISTS idx_legal_templates_active ON legal_templates(is_active);
 